@@ -0,0 +1 @@
+"""Keyboard automation engine used by the AutoKey GUI"""
@@ -0,0 +1,310 @@
+"""Keyboard output backends
+
+Every backend turns key names into its own key objects once (when a plan
+is compiled) and then only has to press and release them. ``tap`` and
+``emit`` let a backend send a whole key group in one go; the defaults fall
+back to one call per event.
+"""
+import os
+import struct
+import sys
+import time
+
+
+class KeyboardBackend:
+    """Base class for key output backends"""
+
+    name = 'base'
+    description = ''
+
+    def __init__(self):
+        self.event_cost = None  # Filled in by measure_event_cost()
+
+    def resolve_key(self, key_name):
+        """Convert a key name into the object passed to press/release"""
+        return key_name
+
+    def press(self, key):
+        raise NotImplementedError
+
+    def release(self, key):
+        raise NotImplementedError
+
+    def tap(self, key):
+        """Press and release one key"""
+        self.press(key)
+        self.release(key)
+
+    def emit(self, ops):
+        """Send a group of (key, is_press) events in order"""
+        for key, is_press in ops:
+            if is_press:
+                self.press(key)
+            else:
+                self.release(key)
+
+    def close(self):
+        """Release any OS resources held by the backend"""
+
+    def measure_event_cost(self, key_name='shift', samples=200):
+        """Time ``samples`` taps of a harmless key and store the per-event cost
+
+        A tap is two events (press + release), so its cost is halved.
+        Returns a dict with mean/p50/p99/max in ns.
+        """
+        key = self.resolve_key(key_name)
+        now = time.perf_counter_ns
+        costs = []
+        for _ in range(samples):
+            start = now()
+            self.tap(key)
+            costs.append((now() - start) // 2)
+        costs.sort()
+        self.event_cost = {
+            'backend': self.name,
+            'samples': samples,
+            'mean_ns': sum(costs) // samples,
+            'p50_ns': costs[(samples - 1) // 2],
+            'p99_ns': costs[min(samples - 1, int(samples * 0.99))],
+            'max_ns': costs[-1],
+        }
+        return self.event_cost
+
+
+class PynputBackend(KeyboardBackend):
+    """Sends keys through pynput (Xlib on Linux, SendInput on Windows, Quartz on macOS)"""
+
+    name = 'pynput'
+    description = 'pynput (all platforms)'
+
+    def __init__(self):
+        super().__init__()
+        from pynput.keyboard import Controller, Key
+        self._key = Key
+        self.controller = Controller()
+
+    def resolve_key(self, key_name):
+        if hasattr(self._key, key_name.lower()):
+            return getattr(self._key, key_name.lower())
+        return key_name
+
+    def press(self, key):
+        self.controller.press(key)
+
+    def release(self, key):
+        self.controller.release(key)
+
+
+class NullBackend(KeyboardBackend):
+    """Accepts every event and sends nothing (dry runs)"""
+
+    name = 'null'
+    description = 'Dry run (no keys sent)'
+
+    def press(self, key):
+        pass
+
+    def release(self, key):
+        pass
+
+    def tap(self, key):
+        pass
+
+    def emit(self, ops):
+        pass
+
+
+class CaptureBackend(KeyboardBackend):
+    """Records every event with its perf_counter_ns time instead of sending it
+
+    Used by the benchmarks and for checking what a plan would send.
+    """
+
+    name = 'capture'
+    description = 'Capture (record events, send nothing)'
+
+    def __init__(self):
+        super().__init__()
+        self.events = []  # (perf_counter_ns, key, is_press)
+
+    def press(self, key):
+        self.events.append((time.perf_counter_ns(), key, True))
+
+    def release(self, key):
+        self.events.append((time.perf_counter_ns(), key, False))
+
+    def press_times(self):
+        """perf_counter_ns of every captured press"""
+        return [t for t, _, is_press in self.events if is_press]
+
+    def clear(self):
+        self.events.clear()
+
+
+# Linux input subsystem constants (linux/input-event-codes.h, linux/uinput.h)
+EV_SYN = 0x00
+EV_KEY = 0x01
+SYN_REPORT = 0
+UI_SET_EVBIT = 0x40045564
+UI_SET_KEYBIT = 0x40045565
+UI_DEV_SETUP = 0x405c5503
+UI_DEV_CREATE = 0x5501
+UI_DEV_DESTROY = 0x5502
+UI_GET_SYSNAME_64 = 0x8040552c  # _IOC(_IOC_READ, 'U', 44, 64)
+BUS_VIRTUAL = 0x06
+
+INPUT_EVENT = struct.Struct('@llHHi')  # struct input_event: timeval, type, code, value
+UINPUT_SETUP = struct.Struct('@HHHH80sI')  # struct uinput_setup
+
+KEY_LEFTSHIFT = 42
+
+EVDEV_KEYCODES = {
+    'esc': 1, 'backspace': 14, 'tab': 15, 'enter': 28, 'space': 57,
+    'ctrl': 29, 'ctrl_l': 29, 'ctrl_r': 97, 'shift': 42, 'shift_l': 42, 'shift_r': 54,
+    'alt': 56, 'alt_l': 56, 'alt_r': 100, 'alt_gr': 100, 'cmd': 125, 'cmd_l': 125, 'cmd_r': 126,
+    'caps_lock': 58, 'num_lock': 69, 'scroll_lock': 70, 'print_screen': 99, 'pause': 119, 'menu': 127,
+    'home': 102, 'up': 103, 'page_up': 104, 'left': 105, 'right': 106, 'end': 107, 'down': 108,
+    'page_down': 109, 'insert': 110, 'delete': 111,
+    'media_volume_mute': 113, 'media_volume_down': 114, 'media_volume_up': 115,
+    'media_next': 163, 'media_play_pause': 164, 'media_previous': 165,
+    '0': 11, '-': 12, '=': 13, '[': 26, ']': 27, ';': 39, "'": 40, '`': 41, '\\': 43, ',': 51, '.': 52, '/': 53,
+}
+EVDEV_KEYCODES.update({str(digit): digit + 1 for digit in range(1, 10)})
+EVDEV_KEYCODES.update({letter: code for code, letter in enumerate('qwertyuiop', 16)})
+EVDEV_KEYCODES.update({letter: code for code, letter in enumerate('asdfghjkl', 30)})
+EVDEV_KEYCODES.update({letter: code for code, letter in enumerate('zxcvbnm', 44)})
+EVDEV_KEYCODES.update({f'f{n}': 58 + n for n in range(1, 11)})
+EVDEV_KEYCODES.update({'f11': 87, 'f12': 88})
+EVDEV_KEYCODES.update({f'f{n}': 170 + n for n in range(13, 25)})
+
+# Characters typed with shift held on a US layout
+SHIFTED_CHARS = dict(zip('~!@#$%^&*()_+{}|:"<>?', "`1234567890-=[]\\;',./"))
+
+
+class UinputBackend(KeyboardBackend):
+    """Writes key events straight to a Linux uinput virtual keyboard
+
+    Each key group (a tap, or a chord in ``emit``) goes out as one
+    ``write()`` of packed ``input_event`` structs followed by a single
+    SYN_REPORT, bypassing Xlib and keysym lookups entirely. Needs write
+    access to /dev/uinput (usually the ``input`` group or a udev rule).
+    """
+
+    name = 'uinput'
+    description = 'Linux uinput (virtual keyboard)'
+    device_name = b'AutoKey virtual keyboard'
+
+    def __init__(self, path='/dev/uinput'):
+        super().__init__()
+        if not sys.platform.startswith('linux'):
+            raise OSError("the uinput backend is only available on Linux")
+        import fcntl
+        self._fcntl = fcntl
+        self.fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            fcntl.ioctl(self.fd, UI_SET_EVBIT, EV_KEY)
+            for code in sorted(set(EVDEV_KEYCODES.values())):
+                fcntl.ioctl(self.fd, UI_SET_KEYBIT, code)
+            setup = UINPUT_SETUP.pack(BUS_VIRTUAL, 0x1234, 0x5678, 1, self.device_name, 0)
+            fcntl.ioctl(self.fd, UI_DEV_SETUP, setup)
+            fcntl.ioctl(self.fd, UI_DEV_CREATE)
+        except OSError:
+            os.close(self.fd)
+            raise
+        # Give udev and the display server a moment to pick up the new device
+        time.sleep(0.2)
+        self._syn = INPUT_EVENT.pack(0, 0, EV_SYN, SYN_REPORT, 0)
+
+    def resolve_key(self, key_name):
+        """Return (keycode, needs_shift); raises ValueError for unknown keys"""
+        name = key_name if len(key_name) == 1 else key_name.lower()
+        shifted = False
+        if len(name) == 1 and name.isupper():
+            name, shifted = name.lower(), True
+        elif name in SHIFTED_CHARS:
+            name, shifted = SHIFTED_CHARS[name], True
+        if name not in EVDEV_KEYCODES:
+            raise ValueError(f"No uinput keycode for key '{key_name}'")
+        return (EVDEV_KEYCODES[name], shifted)
+
+    def _events(self, key, value):
+        code, shifted = key
+        if shifted and value:
+            return INPUT_EVENT.pack(0, 0, EV_KEY, KEY_LEFTSHIFT, 1) + INPUT_EVENT.pack(0, 0, EV_KEY, code, 1)
+        if shifted:
+            return INPUT_EVENT.pack(0, 0, EV_KEY, code, 0) + INPUT_EVENT.pack(0, 0, EV_KEY, KEY_LEFTSHIFT, 0)
+        return INPUT_EVENT.pack(0, 0, EV_KEY, code, value)
+
+    def press(self, key):
+        os.write(self.fd, self._events(key, 1) + self._syn)
+
+    def release(self, key):
+        os.write(self.fd, self._events(key, 0) + self._syn)
+
+    def tap(self, key):
+        os.write(self.fd, self._events(key, 1) + self._syn + self._events(key, 0) + self._syn)
+
+    def emit(self, ops):
+        os.write(self.fd, b''.join(self._events(key, 1 if is_press else 0) for key, is_press in ops) + self._syn)
+
+    def sysname(self):
+        """Kernel name of the virtual device, e.g. 'input42'"""
+        buf = bytearray(64)
+        self._fcntl.ioctl(self.fd, UI_GET_SYSNAME_64, buf)
+        return bytes(buf).split(b'\0', 1)[0].decode()
+
+    def open_loopback(self):
+        """Open our own device's /dev/input/event* node for reading back what was sent
+
+        Returns a non-blocking fd; decode it with ``read_input_events``.
+        """
+        sys_dir = f'/sys/devices/virtual/input/{self.sysname()}'
+        for entry in os.listdir(sys_dir):
+            if entry.startswith('event'):
+                return os.open(f'/dev/input/{entry}', os.O_RDONLY | os.O_NONBLOCK)
+        raise OSError(f"No event node found under {sys_dir}")
+
+    def close(self):
+        if self.fd is None:
+            return
+        try:
+            self._fcntl.ioctl(self.fd, UI_DEV_DESTROY)
+        finally:
+            os.close(self.fd)
+            self.fd = None
+
+
+def read_input_events(fd, max_bytes=INPUT_EVENT.size * 256):
+    """Decode pending EV_KEY events from an evdev fd as (code, value) pairs"""
+    try:
+        data = os.read(fd, max_bytes)
+    except BlockingIOError:
+        return []
+    return [(code, value) for _, _, ev_type, code, value in INPUT_EVENT.iter_unpack(data)
+            if ev_type == EV_KEY]
+
+
+BACKENDS = {
+    'pynput': PynputBackend,
+    'uinput': UinputBackend,
+    'null': NullBackend,
+    'capture': CaptureBackend,
+}
+
+
+def available_backends():
+    """Backend names that can be created on this machine, best default first"""
+    names = ['pynput']
+    if sys.platform.startswith('linux') and os.access('/dev/uinput', os.W_OK):
+        names.append('uinput')
+    names.append('null')
+    return names
+
+
+def create_backend(name):
+    """Instantiate a backend by name"""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown keyboard backend '{name}'") from None
+    return backend_class()
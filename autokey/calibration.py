@@ -0,0 +1,129 @@
+"""Per-host calibration of the backend's injection overhead
+
+A key is only delivered once ``press()``/``release()`` returns, so a step
+sent exactly at its deadline lands one injection cost later, and the key
+of a chord later still, behind its modifiers. ``calibrate`` measures the
+backend's per-event cost on this machine (see
+KeyboardBackend.measure_event_cost) and saves it to
+~/.autokey/calibration.json under the host name, so the next start on the
+same machine can use it straight away.
+
+During a run an OverheadModel starts each step early by the expected cost
+of the events up to its last press, so that press lands on the deadline,
+and watches how late the presses actually land. When the average lateness
+drifts past DRIFT_THRESHOLD_NS and a change in the measured cost accounts
+for it (a busier machine, a slower display server), the expected cost is
+re-calibrated from the live measurements. Lateness from anything else,
+such as steps too close together or a late wake-up, is left alone: a
+different cost would not fix it. Tapping Shift to re-measure would inject
+keys in the middle of the run, so the live samples stand in for it.
+"""
+import json
+import os
+import socket
+import time
+
+
+CALIBRATION_FILE = os.path.join(os.path.expanduser('~'), '.autokey', 'calibration.json')
+DRIFT_THRESHOLD_NS = 50_000  # Average landing lateness that triggers a re-calibration
+EWMA_SHIFT = 4  # Averages move 1/16 of the way towards each new sample
+
+
+def host_name():
+    return socket.gethostname() or 'localhost'
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def load_calibration(backend_name, path=CALIBRATION_FILE):
+    """Saved cost dict of ``backend_name`` on this host, or None"""
+    return _read(path).get(host_name(), {}).get(backend_name)
+
+
+def save_calibration(cost, path=CALIBRATION_FILE):
+    """Store a cost dict (as returned by measure_event_cost) for this host; returns the stored entry"""
+    data = _read(path)
+    entry = data.setdefault(host_name(), {})[cost['backend']] = dict(cost, measured_at=time.time())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write aside and swap in, so a crash never leaves half a file
+    partial = path + '.tmp'
+    with open(partial, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(partial, path)
+    return entry
+
+
+def calibrate(backend, path=CALIBRATION_FILE):
+    """Measure ``backend``'s per-event cost now and save it; returns the cost dict"""
+    return save_calibration(backend.measure_event_cost(), path)
+
+
+def press_depth(ops):
+    """Number of events of a step up to and including its last press"""
+    for n in range(len(ops), 0, -1):
+        if ops[n - 1][1]:
+            return n
+    return len(ops)
+
+
+class OverheadModel:
+    """Expected injection cost per event, corrected online during a run
+
+    ``cost`` is a cost dict (see measure_event_cost) and its median is the
+    starting estimate. The engine waits for ``deadline - lead_ns(depth)``,
+    with ``depth`` from press_depth, and calls ``observe`` after sending
+    each step, which keeps two integer EWMAs: the cost per event and how
+    late the step's last press landed against its table deadline. Once the
+    lateness average is past ``threshold_ns`` either way and the measured
+    cost has moved far enough to explain at least half of it,
+    ``event_cost_ns`` is replaced by the measured cost and
+    ``recalibrations`` counts up. Called only from the playback thread.
+    """
+
+    def __init__(self, cost, threshold_ns=DRIFT_THRESHOLD_NS):
+        self.calibration = cost  # The cost dict this model started from
+        self.event_cost_ns = int(cost['p50_ns'])
+        self.threshold_ns = threshold_ns
+        self.measured_cost_ns = self.event_cost_ns
+        self.lateness_ns = 0
+        self.recalibrations = 0
+
+    def reset(self):
+        """Start a new run from the current expected cost"""
+        self.measured_cost_ns = self.event_cost_ns
+        self.lateness_ns = 0
+        self.recalibrations = 0
+
+    def lead_ns(self, depth):
+        """How long before its deadline a step should start for its press at ``depth`` to land on time"""
+        return depth * self.event_cost_ns
+
+    def observe(self, sent_ns, done_ns, deadline_ns, events, depth):
+        """Account for one sent step of ``events`` events; True when this re-calibrated the model"""
+        if not events:
+            return False
+        step_ns = done_ns - sent_ns
+        self.measured_cost_ns += (step_ns // events - self.measured_cost_ns) >> EWMA_SHIFT
+        # Events are assumed to cost the same, which places the press within the step
+        landed_ns = sent_ns + step_ns * depth // events
+        self.lateness_ns += (landed_ns - deadline_ns - self.lateness_ns) >> EWMA_SHIFT
+        if abs(self.lateness_ns) <= self.threshold_ns:
+            return False
+        # Lateness the cost does not explain would come straight back after a re-calibration
+        if abs(self.measured_cost_ns - self.event_cost_ns) * depth * 2 < self.threshold_ns:
+            return False
+        self.event_cost_ns = max(self.measured_cost_ns, 0)
+        self.lateness_ns = 0
+        self.recalibrations += 1
+        return True
+
+    def cost(self):
+        """The current expected cost as a cost dict for save_calibration"""
+        return dict(self.calibration, p50_ns=self.event_cost_ns, source='online')
@@ -0,0 +1,303 @@
+"""Background playback engine for key sequences"""
+import logging
+import queue
+import threading
+import time
+
+from .calibration import press_depth
+from .scheduler import DeadlineScheduler, ProfiledScheduler, SPIN_THRESHOLD_NS, TokenBucketScheduler, spin_until
+from .tracing import CYCLE, INJECT, WAIT
+
+
+logger = logging.getLogger(__name__)
+
+
+class PlaybackEngine:
+    """Plays key sequences on a dedicated worker thread.
+
+    ``keyboard`` is a KeyboardBackend (see backends.py). The GUI never
+    touches it itself: it posts start/stop/pause
+    commands to a queue and the worker reports back through the
+    ``on_progress(count, elapsed)`` and ``on_finished(count, elapsed, reason)``
+    callbacks. The Qt side connects these to signals, so they are delivered
+    on the GUI thread.
+
+    Progress is also published as plain attributes: ``completed`` repeats
+    since ``run_start_ns``. A GUI samples them on a timer instead of taking
+    a callback per repeat, which keeps fast runs free of cross-thread
+    signalling.
+
+    ``abort()`` is the emergency stop and may be called from any thread.
+    It sets a flag that is checked before every step and throughout every
+    wait, including the final spin, and wakes a blocked wait through the
+    queue. It also counts for a run that ``start()`` has queued but the
+    worker has not begun yet: the flag is only cleared by the next
+    ``start()``, so that run ends before its first key. The run ends with reason ``'aborted'`` and ``abort_latency_ns``
+    holds the time from the request to the end of the last injected step.
+
+    With an ``overhead`` model every step is started its expected injection
+    cost ahead of its deadline, so its key lands on time; telemetry and
+    trace lateness are then measured against that earlier start.
+
+    With a ``verifier`` every step is registered with it just before it is
+    sent, and the run pauses itself (as if Pause had been pressed) once
+    more events than its drop limit have not been seen by the system.
+    """
+
+    def __init__(self, keyboard, on_progress=None, on_finished=None):
+        self.keyboard = keyboard
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.is_running = False
+        self.is_paused = False
+        self.telemetry = None  # Optional TimingRecorder, read at the start of each run
+        self.trace = None  # Optional TraceBuffer for cycle/wait/inject spans, likewise
+        self.overhead = None  # Optional calibration.OverheadModel; steps start early by its lead
+        self.verifier = None  # Optional verify.DeliveryVerifier; too many drops pause the run
+        self._held = ()  # Release events for modifiers currently held down
+        self._commands = queue.Queue()
+        self._thread = None
+        self._quit = False
+        self.completed = 0
+        self.run_start_ns = 0
+        self._abort = threading.Event()
+        self._run_queued = False  # start() was called and the worker has not begun the run yet
+        self._abort_requested_ns = 0
+        self.abort_latency_ns = None
+        self.paused_for_drops = False  # Set when the verifier paused the run; cleared by whoever reports it
+
+    def start(self, plan, repeats=0, cycle_lengths_ns=None, rate_limit=None):
+        """Queue a run of a SequencePlan; ``repeats`` of 0 means until stopped
+
+        ``cycle_lengths_ns`` optionally gives every cycle its own length
+        (a motion profile). It may be a generator; it is read one cycle at
+        a time as the run progresses.
+
+        ``rate_limit`` of (rate_hz, burst) selects burst mode instead: the
+        plan's delays are ignored and steps go out as fast as a token
+        bucket allows (see TokenBucketScheduler).
+        """
+        self._queue_run((plan, repeats, cycle_lengths_ns, rate_limit))
+
+    def _queue_run(self, payload):
+        """Hand a run to the worker; an abort from here on applies to it"""
+        self._abort.clear()
+        self._run_queued = True
+        self._ensure_thread()
+        self._commands.put(('start', payload))
+
+    def stop(self):
+        """Stop the current run within one key interval"""
+        self._commands.put(('stop', None))
+
+    def abort(self, requested_ns=None):
+        """Emergency stop; ``requested_ns`` is when the kill key went down"""
+        if not (self.is_running or self._run_queued):
+            return
+        self._abort_requested_ns = time.perf_counter_ns() if requested_ns is None else requested_ns
+        self._abort.set()
+        self._commands.put(('abort', None))
+
+    def pause(self):
+        """Pause the current run after the key being sent"""
+        self._commands.put(('pause', None))
+
+    def resume(self):
+        """Resume a paused run"""
+        self._commands.put(('resume', None))
+
+    def shutdown(self, timeout=2.0):
+        """Stop any run and wait for the worker thread to exit"""
+        if self._thread is None:
+            return
+        self._commands.put(('quit', None))
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._quit = False
+        self._thread = threading.Thread(target=self._run, name='AutoKeyPlayback', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """Worker loop: wait for a start command, play it, repeat"""
+        while not self._quit:
+            command, payload = self._commands.get()
+            if command == 'start':
+                self._play(*payload)
+            elif command == 'quit':
+                self._quit = True
+            # stop/pause/resume/abort while idle have nothing to act on
+
+    def _play(self, plan, repeats, cycle_lengths_ns=None, rate_limit=None):
+        """Send the sequence until it completes or is stopped"""
+        self._begin_run()
+        count = 0
+        reason = 'completed'
+        steps = plan.steps
+        first_step = plan.first_step
+        release_after = plan.release_after
+        emit = self.keyboard.emit
+        self._held = ()
+        if rate_limit is not None:
+            schedule = TokenBucketScheduler(*rate_limit)
+        elif cycle_lengths_ns is None:
+            schedule = DeadlineScheduler(plan.offsets_ns, plan.cycle_ns)
+        else:
+            schedule = ProfiledScheduler(plan.offsets_ns, plan.cycle_ns, cycle_lengths_ns)
+        start_ns = schedule.begin()
+        self.run_start_ns = start_ns
+        telemetry = self.telemetry
+        if telemetry is not None:
+            telemetry.reset(start_ns, plan.names)
+            record_step = telemetry.record_step
+        trace = self.trace
+        if trace is not None:
+            trace.reset()
+            span = trace.span
+        overhead = self.overhead
+        if overhead is not None:
+            overhead.reset()
+        lead_ns = 0
+        verifier = self.verifier
+        if verifier is not None:
+            verifier.reset()
+        now = time.perf_counter_ns
+        try:
+            while repeats <= 0 or count < repeats:
+                if trace is not None:
+                    cycle_start_ns = now()
+                for i, ops in enumerate(steps):
+                    if i == 0 and count == 0:
+                        ops = first_step
+                    if overhead is not None:
+                        depth = press_depth(ops)
+                        lead_ns = overhead.lead_ns(depth)
+                    if trace is not None:
+                        wait_start_ns = now()
+                    if not self._wait_until(schedule, schedule.deadline(count, i) - lead_ns):
+                        reason = 'aborted' if self._abort.is_set() else 'stopped'
+                        return
+                    if trace is not None or overhead is not None:
+                        inject_start_ns = now()
+                    if trace is not None:
+                        span(WAIT, wait_start_ns, inject_start_ns, i)
+                    if verifier is not None:
+                        verifier.expect(ops, now())
+                    if telemetry is None:
+                        emit(ops)
+                    else:
+                        # One emit either way, so recording does not change what is sent
+                        sent_ns = now()
+                        emit(ops)
+                        # Re-read the deadline: a pause inside the wait moves it
+                        record_step(schedule.deadline(count, i) - lead_ns, sent_ns, now(), i, ops)
+                    if trace is not None:
+                        span(INJECT, inject_start_ns, now(), i, inject_start_ns - schedule.deadline(count, i) + lead_ns)
+                    if overhead is not None:
+                        overhead.observe(inject_start_ns, now(), schedule.deadline(count, i), len(ops), depth)
+                    if verifier is not None and verifier.expire(now()):
+                        self._pause_for_drops(verifier)
+                    # Modifiers this step leaves down for the next one
+                    self._held = release_after[i]
+
+                if trace is not None:
+                    span(CYCLE, cycle_start_ns, now(), count)
+                count += 1
+                self.completed = count
+                if self.on_progress:
+                    self.on_progress(count, (time.perf_counter_ns() - start_ns) / 1e9)
+        except Exception as e:
+            logger.error("Error sending key combination: %s", e)
+            reason = 'error'
+        finally:
+            self._release_held()
+            self._end_run()
+            if self.on_finished:
+                self.on_finished(count, (time.perf_counter_ns() - start_ns) / 1e9, reason)
+
+    def _pause_for_drops(self, verifier):
+        """Pause the run from the playback thread; the next wait picks it up"""
+        logger.warning("%d of %d events were not delivered; pausing", verifier.missing, verifier.sent)
+        self.paused_for_drops = True
+        self._commands.put(('pause', None))
+
+    def _begin_run(self):
+        self.completed = 0
+        self.run_start_ns = time.perf_counter_ns()
+        self.abort_latency_ns = None
+        self.paused_for_drops = False
+        self.is_running = True
+        self._run_queued = False
+
+    def _end_run(self):
+        """Mark the run over once its last key has been sent"""
+        if self._abort.is_set():
+            self.abort_latency_ns = time.perf_counter_ns() - self._abort_requested_ns
+        self.is_running = False
+        self.is_paused = False
+
+    def _wait_until(self, schedule, deadline_ns):
+        """Wait for an absolute deadline while handling commands; False means stop
+
+        Most of the wait blocks on the command queue so Stop/Pause are
+        picked up immediately; only the last SPIN_THRESHOLD_NS is spun.
+        """
+        abort = self._abort
+        while True:
+            if abort.is_set():
+                return False
+            remaining_ns = deadline_ns - time.perf_counter_ns()
+            # Steps closer together than the spin threshold never block, so
+            # look at the queue before spinning or Stop would go unseen
+            if remaining_ns <= SPIN_THRESHOLD_NS and self._commands.empty():
+                if remaining_ns > 0:
+                    return spin_until(deadline_ns, abort)
+                return True
+            try:
+                command, _ = self._commands.get(timeout=max(remaining_ns - SPIN_THRESHOLD_NS, 0) / 1e9)
+            except queue.Empty:
+                continue
+            # An 'abort' only wakes the wait; the flag check above ends it
+            if command in ('stop', 'quit'):
+                self._quit = command == 'quit'
+                return False
+            if command == 'pause':
+                paused_at = time.perf_counter_ns()
+                # Never leave a modifier down while the user has the keyboard
+                held = self._held
+                self._release_held()
+                if not self._wait_while_paused():
+                    return False
+                if held:
+                    self.keyboard.emit(tuple((key, True) for key, _ in reversed(held)))
+                    self._held = held
+                # Everything still ahead moves back by the time spent paused
+                paused_ns = time.perf_counter_ns() - paused_at
+                schedule.shift(paused_ns)
+                deadline_ns += paused_ns
+
+    def _release_held(self):
+        """Release modifiers still held from the last step"""
+        held, self._held = self._held, ()
+        if held:
+            try:
+                self.keyboard.emit(held)
+            except Exception as e:
+                logger.error("Error releasing held keys: %s", e)
+
+    def _wait_while_paused(self):
+        """Block until resumed; False means stop"""
+        self.is_paused = True
+        try:
+            while True:
+                command, _ = self._commands.get()
+                if command == 'resume':
+                    return True
+                if command in ('stop', 'quit') or self._abort.is_set():
+                    self._quit = command == 'quit'
+                    return False
+        finally:
+            self.is_paused = False
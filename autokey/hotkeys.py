@@ -0,0 +1,277 @@
+"""Global trigger hotkeys matched by a prefix trie
+
+A trigger uses the combination grammar: ``ctrl+alt+1`` is a single chord
+and ``f9, f9`` is a sequence of two presses. All registered triggers go
+into one TriggerTrie with Aho-Corasick failure links, so each key press
+advances the match in amortized constant time however many triggers are
+registered. One persistent pynput listener feeds it. Its callbacks only
+look up the key's cached name, update the held modifiers and take one
+trie step, so system-wide typing is never slowed down.
+
+A trigger that is a prefix of another one fires first, which makes the
+longer one unreachable. Keys are compared by canonical name
+(canonical_key_name): a shifted character such as '!' is the unshifted key
+with shift held, since that is what the listener reports. Every step of a trigger needs a key besides its
+modifiers, since modifier presses only change the held set. A trigger
+pressed with modifiers fires once they are all released again, so the
+run it starts does not inject keys while they are still held.
+
+KillSwitch is a separate listener for the emergency stop key, so stopping
+never depends on the trigger listener being enabled.
+"""
+import time
+
+from .backends import SHIFTED_CHARS
+from .sequence import is_modifier, parse_steps
+
+
+# Canonical modifier order in trigger symbols; left/right variants are merged
+MODIFIER_ORDER = ('ctrl', 'alt', 'alt_gr', 'shift', 'cmd')
+_CANONICAL_MODIFIERS = {
+    'ctrl': 'ctrl', 'ctrl_l': 'ctrl', 'ctrl_r': 'ctrl',
+    'alt': 'alt', 'alt_l': 'alt', 'alt_r': 'alt', 'alt_gr': 'alt_gr',
+    'shift': 'shift', 'shift_l': 'shift', 'shift_r': 'shift',
+    'cmd': 'cmd', 'cmd_l': 'cmd', 'cmd_r': 'cmd',
+}
+
+
+def pynput_key_name(key):
+    """Name of a pynput key as used in combinations"""
+    try:
+        if hasattr(key, 'char') and key.char:
+            return key.char
+        return key.name
+    except AttributeError:
+        return str(key).replace('Key.', '')
+
+
+def canonical_key_name(name):
+    """Lower-case key name with left/right modifier variants and shifted characters merged
+
+    A listener reports shift+1 as '!' and shift+a as 'A' (US layout), so
+    keys are compared as the unshifted key; the shift is a modifier (or,
+    for delivery checks, an event) of its own.
+    """
+    if len(name) == 1:
+        name = SHIFTED_CHARS.get(name, name)
+    name = name.lower()
+    return _CANONICAL_MODIFIERS.get(name, name)
+
+
+def is_shifted(name):
+    """True for a character that is typed with shift held, such as '!' or 'A'"""
+    return len(name) == 1 and (name in SHIFTED_CHARS or name.isupper())
+
+
+def chord_symbol(modifiers, key_name):
+    """Trigger symbol of one press: canonical modifiers plus the key"""
+    held = {_CANONICAL_MODIFIERS[mod.lower()] for mod in modifiers}
+    if is_shifted(key_name):
+        held.add('shift')
+    return '+'.join([mod for mod in MODIFIER_ORDER if mod in held] + [canonical_key_name(key_name)])
+
+
+def parse_trigger(text):
+    """'ctrl+alt+1' -> ('ctrl+alt+1',); 'f9, f9' -> ('f9', 'f9'); raises ValueError"""
+    steps = parse_steps(text)
+    for step in steps:
+        if is_modifier(step.key):
+            raise ValueError(f"'{step.label}' has no key besides modifiers")
+    symbols = tuple(chord_symbol(step.modifiers, step.key) for step in steps)
+    if not symbols:
+        raise ValueError("Empty trigger")
+    return symbols
+
+
+class TriggerTrie:
+    """Aho-Corasick automaton over trigger symbols
+
+    Nodes are list indices; ``feed`` walks one symbol and returns the
+    value of a trigger that just completed (or None).
+    """
+
+    def __init__(self):
+        self._children = [{}]
+        self._fail = [0]
+        self._values = [None]
+        self._state = 0
+
+    def __len__(self):
+        return sum(value is not None for value in self._values)
+
+    def add(self, symbols, value):
+        """Register a trigger; call build() once all are added"""
+        node = 0
+        for symbol in symbols:
+            child = self._children[node].get(symbol)
+            if child is None:
+                child = len(self._children)
+                self._children[node][symbol] = child
+                self._children.append({})
+                self._fail.append(0)
+                self._values.append(None)
+            node = child
+        self._values[node] = value
+
+    def build(self):
+        """Compute failure links breadth first"""
+        children, fail, values = self._children, self._fail, self._values
+        queue = list(children[0].values())
+        for node in queue:
+            for symbol, child in children[node].items():
+                # Longest proper suffix of this path that is also a trie path
+                link = fail[node]
+                while link and symbol not in children[link]:
+                    link = fail[link]
+                fail[child] = children[link].get(symbol, 0)
+                if values[child] is None:
+                    values[child] = values[fail[child]]
+                queue.append(child)
+        self._state = 0
+
+    def reset(self):
+        self._state = 0
+
+    def feed(self, symbol):
+        """Advance by one press; returns the matched trigger's value or None"""
+        children, fail = self._children, self._fail
+        node = self._state
+        while node and symbol not in children[node]:
+            node = fail[node]
+        node = children[node].get(symbol, 0)
+        value = self._values[node]
+        # Start over after a match so a trigger cannot fire on its own tail
+        self._state = 0 if value is not None else node
+        return value
+
+
+class HotkeyListener:
+    """One persistent global keyboard listener that fires registered triggers
+
+    ``on_trigger(value)`` is called on the listener thread; the GUI passes
+    a Qt signal's ``emit`` so the work happens on the GUI thread. It is
+    called when the trigger's last key goes down, or if modifiers are held
+    at that point, when the last of them comes back up.
+    """
+
+    def __init__(self, on_trigger):
+        self.on_trigger = on_trigger
+        self.trie = TriggerTrie()
+        self._listener = None
+        self._held = set()
+        self._pending = None  # Matched trigger waiting for its modifiers to be released
+        self._names = {}  # pynput key -> (canonical name, canonical modifier or None, shifted)
+
+    def set_triggers(self, triggers):
+        """Replace all triggers with (trigger_text, value) pairs
+
+        The new trie is built off to the side and swapped in with one
+        assignment, so the listener never sees a half-built one. Returns
+        the texts that could not be parsed.
+        """
+        trie = TriggerTrie()
+        invalid = []
+        for text, value in triggers:
+            try:
+                trie.add(parse_trigger(text), value)
+            except ValueError:
+                invalid.append(text)
+        trie.build()
+        self.trie = trie
+        return invalid
+
+    @property
+    def is_running(self):
+        return self._listener is not None
+
+    def start(self):
+        if self._listener is not None:
+            return
+        from pynput.keyboard import Listener
+        self._held.clear()
+        self._pending = None
+        self._listener = Listener(on_press=self._on_press, on_release=self._on_release)
+        self._listener.start()
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def _lookup(self, key):
+        entry = self._names.get(key)
+        if entry is None:
+            name = pynput_key_name(key)
+            if len(name) == 1 and ord(name) < 32:
+                # Some platforms report ctrl+letter as a control character
+                name = chr(ord(name) + 96)
+            entry = self._names[key] = (canonical_key_name(name), _CANONICAL_MODIFIERS.get(name.lower()),
+                                        is_shifted(name))
+        return entry
+
+    def _on_press(self, key):
+        name, modifier, shifted = self._lookup(key)
+        if modifier is not None:
+            self._held.add(modifier)
+            return
+        held = self._held
+        if shifted and 'shift' not in held:
+            # Caps Lock: the character implies shift without it being held
+            held = held | {'shift'}
+        symbol = '+'.join([mod for mod in MODIFIER_ORDER if mod in held] + [name]) if held else name
+        value = self.trie.feed(symbol)
+        if value is None:
+            return
+        if self._held:
+            self._pending = value
+        else:
+            self.on_trigger(value)
+
+    def _on_release(self, key):
+        name, modifier, _ = self._lookup(key)
+        if modifier is None:
+            return
+        held = self._held
+        held.discard(modifier)
+        if not held and self._pending is not None:
+            value, self._pending = self._pending, None
+            self.on_trigger(value)
+
+
+class KillSwitch:
+    """Global listener for a single emergency stop key
+
+    ``on_kill(pressed_ns)`` is called on the listener thread with the
+    perf_counter_ns timestamp of the press, so the engine can abort
+    straight away and measure its abort latency from the key press.
+    """
+
+    def __init__(self, on_kill, key_name='pause'):
+        self.on_kill = on_kill
+        self.key_name = key_name
+        self._listener = None
+        self._names = {}
+
+    @property
+    def is_running(self):
+        return self._listener is not None
+
+    def start(self):
+        if self._listener is not None:
+            return
+        from pynput.keyboard import Listener
+        self._listener = Listener(on_press=self._on_press)
+        self._listener.start()
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def _on_press(self, key):
+        pressed_ns = time.perf_counter_ns()
+        name = self._names.get(key)
+        if name is None:
+            name = self._names[key] = pynput_key_name(key).lower()
+        if name == self.key_name:
+            self.on_kill(pressed_ns)
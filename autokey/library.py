@@ -0,0 +1,173 @@
+"""Saved sequence library, stored in SQLite under ~/.autokey
+
+Each sequence is split over two tables: ``sequences`` holds the small
+metadata rows the library list shows (name, tags, trigger, step count,
+cycle time) and ``sequence_bodies`` holds the combination, its timing
+table and the run settings. Listing and searching only read metadata, so
+they stay fast however large the saved bodies are; a body is fetched by
+primary key when a sequence is selected.
+"""
+import json
+import os
+import sqlite3
+import time
+from array import array
+from dataclasses import dataclass, field
+
+
+DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.autokey')
+LIBRARY_FILE = 'library.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sequences (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    tags TEXT NOT NULL DEFAULT '',
+    step_count INTEGER NOT NULL,
+    cycle_ms INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    trigger TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS sequence_bodies (
+    sequence_id INTEGER PRIMARY KEY REFERENCES sequences(id) ON DELETE CASCADE,
+    combination TEXT NOT NULL,
+    intervals BLOB NOT NULL,
+    settings TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS sequence_tags (
+    sequence_id INTEGER NOT NULL REFERENCES sequences(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL COLLATE NOCASE,
+    PRIMARY KEY (tag, sequence_id)
+);
+"""
+
+
+def parse_tags(text):
+    """'DV, fast ,dv' -> ('DV', 'fast'): trimmed, without empties or duplicates"""
+    tags = []
+    for tag in text.split(','):
+        tag = tag.strip()
+        if tag and tag.lower() not in (t.lower() for t in tags):
+            tags.append(tag)
+    return tuple(tags)
+
+
+@dataclass(frozen=True)
+class SequenceInfo:
+    """Metadata row of a saved sequence"""
+    id: int
+    name: str
+    tags: tuple
+    step_count: int
+    cycle_ms: int
+    updated_at: float
+    trigger: str = ''
+
+
+@dataclass(frozen=True)
+class SavedSequence:
+    """Everything needed to restore a sequence in the GUI
+
+    ``settings`` holds the run options that go with it (stop key, DV step
+    size, motion profile, repeats) as plain JSON values.
+    """
+    name: str
+    combination: str
+    intervals: tuple
+    tags: tuple = ()
+    settings: dict = field(default_factory=dict)
+    trigger: str = ''
+
+
+class SequenceLibrary:
+    """Named sequences in one SQLite file"""
+
+    def __init__(self, path=None):
+        if path is None:
+            os.makedirs(DEFAULT_DIR, exist_ok=True)
+            path = os.path.join(DEFAULT_DIR, LIBRARY_FILE)
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.executescript(SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(sequences)")}
+        if 'trigger' not in columns:
+            # Libraries created before global triggers
+            self._db.execute("ALTER TABLE sequences ADD COLUMN trigger TEXT NOT NULL DEFAULT ''")
+
+    def close(self):
+        self._db.close()
+
+    def _infos(self, rows):
+        return [SequenceInfo(row[0], row[1], parse_tags(row[2]), row[3], row[4], row[5], row[6]) for row in rows]
+
+    def list(self):
+        """Metadata of every saved sequence, sorted by name"""
+        rows = self._db.execute(
+            "SELECT id, name, tags, step_count, cycle_ms, updated_at, trigger FROM sequences ORDER BY name")
+        return self._infos(rows)
+
+    def search(self, text):
+        """Sequences whose name contains ``text`` or that have a tag starting with it"""
+        text = text.strip()
+        if not text:
+            return self.list()
+        pattern = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        rows = self._db.execute(
+            "SELECT id, name, tags, step_count, cycle_ms, updated_at, trigger FROM sequences "
+            "WHERE name LIKE ? ESCAPE '\\' "
+            "OR id IN (SELECT sequence_id FROM sequence_tags WHERE tag LIKE ? ESCAPE '\\') "
+            "ORDER BY name",
+            (f'%{pattern}%', f'{pattern}%'))
+        return self._infos(rows)
+
+    def load(self, sequence_id):
+        """Fetch one SavedSequence; raises KeyError if it no longer exists"""
+        row = self._db.execute(
+            "SELECT s.name, s.tags, b.combination, b.intervals, b.settings, s.trigger "
+            "FROM sequences s JOIN sequence_bodies b ON b.sequence_id = s.id WHERE s.id = ?",
+            (sequence_id,)).fetchone()
+        if row is None:
+            raise KeyError(sequence_id)
+        name, tags, combination, intervals_blob, settings, trigger = row
+        intervals = array('i')
+        intervals.frombytes(intervals_blob)
+        return SavedSequence(name=name,
+                             combination=combination,
+                             intervals=tuple(intervals),
+                             tags=parse_tags(tags),
+                             settings=json.loads(settings),
+                             trigger=trigger)
+
+    def save(self, sequence, step_count):
+        """Insert or replace the sequence with this name; returns its id"""
+        tags = parse_tags(','.join(sequence.tags))
+        intervals = array('i', sequence.intervals)
+        with self._db:
+            row = self._db.execute("SELECT id FROM sequences WHERE name = ?", (sequence.name,)).fetchone()
+            values = (sequence.name, ', '.join(tags), step_count, sum(intervals), time.time(), sequence.trigger.strip())
+            if row is None:
+                sequence_id = self._db.execute(
+                    "INSERT INTO sequences (name, tags, step_count, cycle_ms, updated_at, trigger) VALUES (?, ?, ?, ?, ?, ?)",
+                    values).lastrowid
+            else:
+                sequence_id = row[0]
+                self._db.execute(
+                    "UPDATE sequences SET name = ?, tags = ?, step_count = ?, cycle_ms = ?, updated_at = ?, trigger = ? "
+                    "WHERE id = ?",
+                    values + (sequence_id,))
+            self._db.execute(
+                "INSERT OR REPLACE INTO sequence_bodies (sequence_id, combination, intervals, settings) VALUES (?, ?, ?, ?)",
+                (sequence_id, sequence.combination, intervals.tobytes(), json.dumps(sequence.settings)))
+            self._db.execute("DELETE FROM sequence_tags WHERE sequence_id = ?", (sequence_id,))
+            self._db.executemany("INSERT INTO sequence_tags (sequence_id, tag) VALUES (?, ?)",
+                                 [(sequence_id, tag) for tag in tags])
+        return sequence_id
+
+    def triggers(self):
+        """(trigger_text, sequence_id) for every sequence that has a trigger"""
+        return list(self._db.execute("SELECT trigger, id FROM sequences WHERE trigger != ''"))
+
+    def delete(self, sequence_id):
+        with self._db:
+            self._db.execute("DELETE FROM sequences WHERE id = ?", (sequence_id,))
@@ -0,0 +1,41 @@
+"""Leveled, buffered logging for the GUI
+
+Modules log through ``logging.getLogger(__name__)``. ``configure`` puts a
+MemoryHandler in front of the real output, so records are formatted and
+written in batches: when the buffer fills, when a warning or worse
+arrives, and at exit. Nothing is written from the playback thread's hot
+path. A windowed build has no console (``sys.stderr`` is None), so the
+output then goes to ~/.autokey/autokey.log instead.
+"""
+import logging
+import logging.handlers
+import os
+import sys
+
+
+LEVEL_ENV = 'AUTOKEY_LOG_LEVEL'
+DEFAULT_LEVEL = 'INFO'
+LOG_FILE = os.path.join(os.path.expanduser('~'), '.autokey', 'autokey.log')
+BUFFER_RECORDS = 256
+FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+
+def configure(level=None):
+    """Set up the 'autokey' logger; the level defaults to $AUTOKEY_LOG_LEVEL or INFO"""
+    level = (level or os.environ.get(LEVEL_ENV) or DEFAULT_LEVEL).upper()
+    if sys.stderr is not None:
+        target = logging.StreamHandler(sys.stderr)
+    else:
+        os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+        target = logging.FileHandler(LOG_FILE, encoding='utf-8', delay=True)
+    target.setFormatter(logging.Formatter(FORMAT))
+    buffered = logging.handlers.MemoryHandler(BUFFER_RECORDS, flushLevel=logging.WARNING, target=target)
+
+    logger = logging.getLogger('autokey')
+    logger.setLevel(getattr(logging, level, logging.INFO))
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+    logger.addHandler(buffered)
+    logger.propagate = False
+    return logger
@@ -0,0 +1,215 @@
+"""Compact binary macro files (.akm)
+
+A recording saved as a macro is a fixed header, the key name table and
+one 11-byte record per event, all little-endian::
+
+    header   magic 'AKMACRO\\0', version u16, key count u16, event count u32,
+             duration_ns u64 (first to last event), cycle_ns u64
+    keys     key count x (length u8, UTF-8 name)
+    events   event count x (key index u16, action u8, delta_ns u64)
+
+``delta_ns`` is the time since the previous event (0 for the first).
+Key names rather than backend keycodes are stored, so a macro plays on
+any backend.
+
+Opening a macro maps the file and reads only the header and key table.
+MacroPlan plays it straight from the mapping: the engine's steps and
+offsets are views that unpack records as they are reached, so an hour
+long recording opens instantly and costs page cache, not Python objects.
+"""
+import mmap
+import struct
+
+from .plan import DEFAULT_INTERVAL_MS
+from .scheduler import NS_PER_MS
+from .telemetry import PRESS
+
+
+MAGIC = b'AKMACRO\0'
+VERSION = 1
+HEADER = struct.Struct('<8sHHIQQ')
+RECORD = struct.Struct('<HBQ')
+EXTENSION = '.akm'
+
+
+def save_macro(path, event_log, default_ms=DEFAULT_INTERVAL_MS):
+    """Write an EventLog to ``path``; returns the number of events written"""
+    count = len(event_log)
+    if not count:
+        raise ValueError("Nothing recorded to save")
+    timestamps = event_log.timestamps_ns
+    first_ns, last_ns = timestamps[0], timestamps[-1]
+    duration_ns = last_ns - first_ns
+    cycle_ns = max(event_log.end_ns - first_ns, duration_ns + default_ms * NS_PER_MS)
+
+    records = bytearray(RECORD.size * count)
+    previous_ns = first_ns
+    offset = 0
+    for key_id, action, timestamp_ns in zip(event_log.key_ids, event_log.actions, timestamps):
+        RECORD.pack_into(records, offset, key_id, action, timestamp_ns - previous_ns)
+        previous_ns = timestamp_ns
+        offset += RECORD.size
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(event_log.key_names), count, duration_ns, cycle_ns))
+        for name in event_log.key_names:
+            encoded = name.encode('utf-8')
+            f.write(struct.pack('<B', len(encoded)) + encoded)
+        f.write(records)
+    return count
+
+
+class Macro:
+    """A memory-mapped macro file
+
+    ``records`` is a zero-copy memoryview of the event records.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"{path} is empty") from None
+        try:
+            self._parse()
+        except (ValueError, struct.error, UnicodeDecodeError):
+            self._map.close()
+            raise ValueError(f"{path} is not an AutoKey macro file") from None
+
+    def _parse(self):
+        """Read the header and key table; ValueError if a section runs past the end of the file"""
+        buffer = self._map
+        size = len(buffer)
+        if size < HEADER.size:
+            raise ValueError
+        magic, version, key_count, self.event_count, self.duration_ns, self.cycle_ns = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError
+        offset = HEADER.size
+        self.key_names = []
+        for _ in range(key_count):
+            if offset >= size:
+                raise ValueError
+            length = buffer[offset]
+            if offset + 1 + length > size:
+                raise ValueError
+            self.key_names.append(bytes(buffer[offset + 1:offset + 1 + length]).decode('utf-8'))
+            offset += 1 + length
+        self.records_offset = offset
+        if size < offset + self.event_count * RECORD.size:
+            raise ValueError
+        self.records = memoryview(buffer)[offset:offset + self.event_count * RECORD.size]
+
+    def __len__(self):
+        return self.event_count
+
+    def events(self):
+        """Yield (key_name, action, delta_ns) by iterating the mapped records"""
+        names = self.key_names
+        for key_id, action, delta_ns in RECORD.iter_unpack(self.records):
+            yield names[key_id], action, delta_ns
+
+    def close(self):
+        """Unmap the file; only once nothing is playing it any more"""
+        self.records.release()
+        self._map.close()
+
+
+class _RecordView:
+    """Read-only sequence over the records of a Macro"""
+
+    def __init__(self, macro):
+        self._macro = macro
+        self._records = macro.records
+        self._len = len(macro)
+
+    def __len__(self):
+        return self._len
+
+    def _index(self, i):
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        return i
+
+    def _record(self, i):
+        return RECORD.unpack_from(self._records, i * RECORD.size)
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self[i]
+
+
+class _StepView(_RecordView):
+    """steps[i] -> ((key, is_press),) with keys resolved once per name"""
+
+    def __init__(self, macro, keys):
+        super().__init__(macro)
+        self._keys = keys
+
+    def __getitem__(self, i):
+        key_id, action, _ = self._record(self._index(i))
+        return ((self._keys[key_id], action == PRESS),)
+
+
+class _NameView(_RecordView):
+    def __getitem__(self, i):
+        return self._macro.key_names[self._record(self._index(i))[0]]
+
+
+class _OffsetView(_RecordView):
+    """offsets_ns[i], summed from the deltas
+
+    Playback reads offsets in order, so the running sum is kept and the
+    next offset costs one record. Going backwards re-sums from the start.
+    """
+
+    def __init__(self, macro):
+        super().__init__(macro)
+        self._i = 0
+        self._offset_ns = 0
+
+    def __getitem__(self, i):
+        i = self._index(i)
+        if i == self._len - 1:
+            return self._macro.duration_ns
+        if i < self._i:
+            self._i = self._offset_ns = 0
+        while self._i < i:
+            self._i += 1
+            self._offset_ns += self._record(self._i)[2]
+        return self._offset_ns
+
+
+class _NothingHeld:
+    """release_after for a macro: every event is its own press or release"""
+
+    def __getitem__(self, i):
+        return ()
+
+
+class MacroPlan:
+    """A SequencePlan look-alike that plays a Macro from its mapping"""
+
+    def __init__(self, macro, resolve_key):
+        if not len(macro):
+            raise ValueError(f"{macro.path} has no events")
+        self.macro = macro
+        keys = [resolve_key(name) for name in macro.key_names]
+        self.names = _NameView(macro)
+        self.steps = _StepView(macro, keys)
+        self.offsets_ns = _OffsetView(macro)
+        self.cycle_ns = macro.cycle_ns
+        self.first_step = self.steps[0]
+        self.release_after = _NothingHeld()
+
+    def __len__(self):
+        return len(self.macro)
+
+
+def open_macro(path, resolve_key):
+    """Map a macro file and return a MacroPlan for it"""
+    return MacroPlan(Macro(path), resolve_key)
@@ -0,0 +1,110 @@
+"""Acceleration profiles for long repeat runs (DV moves)
+
+A DV move repeats one cycle many times. With the constant profile every
+cycle lasts the plan's own cycle time. The trapezoidal and S-curve
+profiles start at that rate, speed up to ``max_rate_hz`` cycles per second
+over the first ``ramp`` cycles and slow down again over the last
+``ramp``, so the approach to the final DV is as gentle as a constant run
+while the middle of a long move goes much faster.
+
+A move can be millions of cycles long, but only its ramps differ from
+cycle to cycle. MotionTimeline keeps just the ramp (computed in one
+vectorized pass), streams the cycle lengths in fixed-size chunks and
+answers elapsed/remaining time in O(1).
+"""
+import numpy as np
+
+from .profiles import CONSTANT, PROFILES, TRAPEZOIDAL
+
+
+CHUNK_CYCLES = 4096
+
+
+def ramp_rates(kind, distances, base_rate_hz, max_rate_hz, ramp):
+    """Rate in cycles per second at ``distances`` cycles from the nearer end of a move
+
+    ``base_rate_hz`` is the rate at both ends. A profile never goes slower
+    than that, so a ``max_rate_hz`` at or below it gives a constant run.
+    """
+    if kind not in PROFILES:
+        raise ValueError(f"Unknown motion profile '{kind}'")
+    distances = np.asarray(distances, dtype=np.float64)
+    if kind == CONSTANT or max_rate_hz <= base_rate_hz:
+        return np.full(distances.shape, float(base_rate_hz))
+    ramp = max(1, ramp)
+    if kind == TRAPEZOIDAL:
+        # Constant acceleration: v^2 = v0^2 + 2*a*s reaches the max rate at s == ramp
+        accel = (max_rate_hz ** 2 - base_rate_hz ** 2) / (2 * ramp)
+        rate = np.sqrt(base_rate_hz ** 2 + 2 * accel * distances)
+    else:
+        # Smoothstep: acceleration starts and ends at zero
+        x = np.clip(distances / ramp, 0.0, 1.0)
+        rate = base_rate_hz + (max_rate_hz - base_rate_hz) * x * x * (3 - 2 * x)
+    return np.minimum(rate, max_rate_hz)
+
+
+class MotionTimeline:
+    """Cycle lengths of a profiled run of ``repeats`` cycles
+
+    The first ``ramp`` cycles and the last ``ramp`` cycles mirror each
+    other; everything in between runs at the plateau length. Memory is
+    bounded by the ramp, not by the number of repeats.
+    """
+
+    def __init__(self, kind, repeats, cycle_ns, max_rate_hz, ramp):
+        if cycle_ns <= 0:
+            raise ValueError("The sequence needs a delay of at least 1 ms")
+        self.repeats = repeats
+        base_rate_hz = 1e9 / cycle_ns
+        if kind == CONSTANT or max_rate_hz <= base_rate_hz:
+            ramp = 0
+        # A move too short for both ramps turns around before the max rate
+        steps = min(max(0, ramp), (repeats + 1) // 2)
+        rates = ramp_rates(kind, np.arange(steps + 1), base_rate_hz, max_rate_hz, ramp)
+        lengths = np.rint(1e9 / rates).astype(np.int64)
+        self.ramp_ns = lengths[:steps]
+        self.plateau_ns = int(lengths[steps]) if steps else cycle_ns
+        self._ramp_cum = np.concatenate(([0], np.cumsum(self.ramp_ns)))
+        self._up = steps                        # cycles [0, up) ramp up
+        self._down = min(steps, repeats // 2)   # cycles [repeats - down, repeats) ramp down
+        self.total_ns = self.elapsed_ns(repeats)
+
+    def elapsed_ns(self, cycles):
+        """Nominal time taken by the first ``cycles`` cycles"""
+        cycles = min(max(0, cycles), self.repeats)
+        up, down, repeats = self._up, self._down, self.repeats
+        elapsed = int(self._ramp_cum[min(cycles, up)])
+        elapsed += self.plateau_ns * max(0, min(cycles, repeats - down) - up)
+        if cycles > repeats - down:
+            # Cycle p of the ramp down sits repeats - 1 - p cycles from the end
+            elapsed += int(self._ramp_cum[down] - self._ramp_cum[repeats - cycles])
+        return elapsed
+
+    def remaining_ns(self, cycles):
+        """Nominal time left after ``cycles`` cycles"""
+        return self.total_ns - self.elapsed_ns(cycles)
+
+    def chunks(self, size=CHUNK_CYCLES):
+        """Yield the cycle lengths as lists of at most ``size`` ints"""
+        repeats = self.repeats
+        ramp_ns = self.ramp_ns
+        for start in range(0, repeats, size):
+            position = np.arange(start, min(start + size, repeats))
+            distance = np.minimum(position, repeats - 1 - position)
+            if len(ramp_ns) and distance.min() < len(ramp_ns):
+                lengths = np.where(distance < len(ramp_ns),
+                                   ramp_ns[np.minimum(distance, len(ramp_ns) - 1)],
+                                   self.plateau_ns)
+                yield lengths.tolist()
+            else:
+                yield [self.plateau_ns] * len(position)
+
+    def cycle_lengths(self, chunk_size=CHUNK_CYCLES):
+        """Lazily yield every cycle length in ns"""
+        for chunk in self.chunks(chunk_size):
+            yield from chunk
+
+
+def move_time_s(kind, repeats, cycle_ns, max_rate_hz, ramp):
+    """Total time of a profiled run in seconds"""
+    return MotionTimeline(kind, repeats, cycle_ns, max_rate_hz, ramp).total_ns / 1e9
@@ -0,0 +1,146 @@
+"""Several sequences played together from one injection thread
+
+Each Track repeats its own plan at its own period. Every step of every
+track is a deadline in one min-heap, so picking the next event costs
+O(log n) in the number of tracks. Events are sent by the single playback
+thread one whole step at a time, so a chord from one track is never split
+by a key from another. For the same reason modifiers are not held between
+steps here: compile track plans with ``hold_modifiers=False``.
+"""
+import heapq
+import logging
+import time
+from dataclasses import dataclass, field
+
+from .calibration import press_depth
+from .engine import PlaybackEngine
+from .telemetry import TimingRecorder
+from .tracing import INJECT, WAIT
+
+
+TRACK_TELEMETRY_CAPACITY = 1 << 14
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Track:
+    """One sequence in a multi-sequence run
+
+    ``repeats`` of 0 repeats until the run is stopped. On equal deadlines
+    the track with the lower ``priority`` number goes first; ``phase_ns``
+    delays the track's first cycle.
+    """
+    name: str
+    plan: object
+    repeats: int = 0
+    priority: int = 0
+    phase_ns: int = 0
+    count: int = 0
+    telemetry: TimingRecorder = field(default_factory=lambda: TimingRecorder(TRACK_TELEMETRY_CAPACITY))
+
+
+class _RunClock:
+    """Origin of every track's deadlines; a pause shifts them all at once"""
+
+    def __init__(self):
+        self.start_ns = time.perf_counter_ns()
+
+    def shift(self, delta_ns):
+        self.start_ns += delta_ns
+
+
+class MultiPlaybackEngine(PlaybackEngine):
+    """PlaybackEngine that interleaves several Tracks
+
+    Progress reports the number of cycles completed by all tracks
+    together. A finished track drops out of the heap and the run completes
+    when none is left, so a run with an endless track lasts until stopped.
+    Each track's press lateness is recorded in its own ``telemetry``.
+    The ``trace`` gets wait and inject spans only, since the cycles of
+    different tracks overlap.
+    """
+
+    def __init__(self, keyboard, on_progress=None, on_finished=None):
+        super().__init__(keyboard, on_progress, on_finished)
+        self.tracks = []
+
+    def start(self, tracks):
+        """Queue a run of a list of Tracks"""
+        self.tracks = list(tracks)
+        self._queue_run((self.tracks,))
+
+    def _play(self, tracks):
+        self._begin_run()
+        total = 0
+        reason = 'completed'
+        emit = self.keyboard.emit
+        now = time.perf_counter_ns
+        clock = _RunClock()
+        start_ns = clock.start_ns
+        self.run_start_ns = start_ns
+        # (due_ns from the clock origin, priority, track index, cycle, step index)
+        heap = []
+        for t, track in enumerate(tracks):
+            track.count = 0
+            track.telemetry.reset(start_ns, track.plan.names)
+            heap.append((track.phase_ns + track.plan.offsets_ns[0], track.priority, t, 0, 0))
+        heapq.heapify(heap)
+        trace = self.trace
+        if trace is not None:
+            trace.reset()
+        overhead = self.overhead
+        if overhead is not None:
+            overhead.reset()
+        lead_ns = 0
+        verifier = self.verifier
+        if verifier is not None:
+            verifier.reset()
+        try:
+            while heap:
+                due_ns, priority, t, cycle, i = heapq.heappop(heap)
+                track = tracks[t]
+                plan = track.plan
+                ops = plan.steps[i]
+                if overhead is not None:
+                    depth = press_depth(ops)
+                    lead_ns = overhead.lead_ns(depth)
+                wait_start_ns = now()
+                if not self._wait_until(clock, clock.start_ns + due_ns - lead_ns):
+                    reason = 'aborted' if self._abort.is_set() else 'stopped'
+                    return
+                deadline_ns = clock.start_ns + due_ns - lead_ns
+                inject_start_ns = now()
+                if verifier is not None:
+                    verifier.expect(ops, inject_start_ns)
+                sent_ns = now()
+                emit(ops)
+                track.telemetry.record_step(deadline_ns, sent_ns, now(), i, ops)
+                if trace is not None:
+                    trace.span(WAIT, wait_start_ns, inject_start_ns, i)
+                    trace.span(INJECT, inject_start_ns, now(), i, inject_start_ns - deadline_ns)
+                if overhead is not None:
+                    overhead.observe(inject_start_ns, now(), deadline_ns + lead_ns, len(ops), depth)
+                if verifier is not None and verifier.expire(now()):
+                    self._pause_for_drops(verifier)
+
+                i += 1
+                if i == len(plan.steps):
+                    i = 0
+                    cycle += 1
+                    track.count = cycle
+                    total += 1
+                    self.completed = total
+                    if self.on_progress:
+                        self.on_progress(total, (now() - start_ns) / 1e9)
+                    if track.repeats and cycle >= track.repeats:
+                        continue  # Finished; the run ends once the heap is empty
+                heapq.heappush(heap, (track.phase_ns + cycle * plan.cycle_ns + plan.offsets_ns[i],
+                                      priority, t, cycle, i))
+        except Exception as e:
+            logger.error("Error sending key combination: %s", e)
+            reason = 'error'
+        finally:
+            self._end_run()
+            if self.on_finished:
+                self.on_finished(total, (now() - start_ns) / 1e9, reason)
@@ -0,0 +1,337 @@
+"""Compiled, immutable key sequence plans"""
+from dataclasses import dataclass
+
+from .scheduler import NS_PER_MS, offsets_from_intervals
+from .sequence import HOLD_MAX_GAP_MS, compile_events, parse_program, step_events
+from .telemetry import PRESS
+
+
+DEFAULT_INTERVAL_MS = 100
+
+
+@dataclass(frozen=True)
+class SequencePlan:
+    """Everything the playback loop needs, resolved up front
+
+    Step ``i`` sends the key group ``steps[i]`` - a tuple of
+    ``(key, is_press)`` events with backend key objects - at
+    ``offsets_ns[i]`` after the start of a cycle. ``names[i]`` labels the
+    step for status and telemetry, and a cycle lasts ``cycle_ns``.
+
+    Modifiers may stay down between close steps of a cycle (see
+    sequence.compile_events): ``first_step`` is sent for ``steps[0]`` in
+    the first cycle and ``release_after[i]`` lets go of whatever is still
+    held after step ``i``. Nothing here refers back to the UI.
+    """
+    names: tuple
+    steps: tuple
+    offsets_ns: tuple
+    cycle_ns: int
+    first_step: tuple = None
+    release_after: tuple = None
+
+    def __post_init__(self):
+        if self.first_step is None:
+            object.__setattr__(self, 'first_step', self.steps[0])
+        if self.release_after is None:
+            object.__setattr__(self, 'release_after', ((),) * len(self.steps))
+
+    def __len__(self):
+        return len(self.steps)
+
+
+def parse_rows(combo_text):
+    """The timing table rows of a combination: its Steps as written, before repeats
+
+    Unparsable text gives [].
+    """
+    try:
+        return list(parse_program(combo_text).leaves)
+    except ValueError:
+        return []
+
+
+def parse_keys(combo_text):
+    """Labels of the steps in a combination, one per timing table row
+
+    Chords come back as one label (``'ctrl+c'``); unparsable text gives [].
+    """
+    return [step.label for step in parse_rows(combo_text)]
+
+
+def _row_delays_ms(program, timing_intervals, default_ms):
+    return [int(step.delay_ms if step.delay_ms is not None else
+                timing_intervals[i] if i < len(timing_intervals) else default_ms)
+            for i, step in enumerate(program.leaves)]
+
+
+def combination_cycle_ns(combo_text, timing_intervals, default_ms=DEFAULT_INTERVAL_MS):
+    """Length of one cycle of a combination, without resolving keys; 0 if it does not parse"""
+    try:
+        program = parse_program(combo_text)
+    except ValueError:
+        return 0
+    if not program.leaves:
+        return 0
+    delays_ns = [delay * NS_PER_MS for delay in _row_delays_ms(program, timing_intervals, default_ms)]
+    return program.durations(delays_ns)[id(program.root)]
+
+
+def combination_steps(combo_text):
+    """Number of steps in one cycle of a combination, repeats expanded; 0 if it does not parse"""
+    try:
+        return len(parse_program(combo_text))
+    except ValueError:
+        return 0
+
+
+def compile_plan(combo_text, timing_intervals, resolve_key, default_ms=DEFAULT_INTERVAL_MS, hold_modifiers=True):
+    """Build a plan from the combination text and table delays
+
+    ``timing_intervals`` has one delay per row (see parse_rows); a step's
+    own ``@`` delay takes precedence. Each step is a tap, with its chord's
+    modifiers held only as long as needed, or only within the step with
+    ``hold_modifiers=False``. A combination with repeats becomes a
+    ProgramPlan that expands them while it plays; others are compiled in
+    full. Returns None when there are no keys to send; raises ValueError
+    for text that cannot be parsed or keys the backend lacks.
+    """
+    program = parse_program(combo_text)
+    if not program.leaves:
+        return None
+    delays_ms = _row_delays_ms(program, timing_intervals, default_ms)
+    if not program.is_flat:
+        return ProgramPlan(program, delays_ms, resolve_key, hold_modifiers)
+    steps = program.leaves
+    offsets_ns, cycle_ns = offsets_from_intervals(delays_ms, len(steps), default_ms)
+    first_step, cycle_steps, release_after = compile_events(steps, resolve_key, hold_modifiers, delays_ms)
+    return SequencePlan(names=tuple(step.label for step in steps),
+                        steps=cycle_steps,
+                        offsets_ns=offsets_ns,
+                        cycle_ns=cycle_ns,
+                        first_step=first_step,
+                        release_after=release_after)
+
+
+def compile_recording(event_log, resolve_key, default_ms=DEFAULT_INTERVAL_MS):
+    """Build a SequencePlan that replays an EventLog with its original timing
+
+    Every recorded press and release is its own step at its recorded
+    offset. A cycle ends where the stop key was pressed, so repeats are
+    spaced like the original recording. Returns None for an empty log.
+    """
+    if not len(event_log):
+        return None
+    resolved = {}
+    names, steps, offsets_ns = [], [], []
+    first_ns = None
+    for name, action, timestamp_ns in event_log.events():
+        if first_ns is None:
+            first_ns = timestamp_ns
+        if name not in resolved:
+            resolved[name] = resolve_key(name)
+        names.append(name)
+        steps.append(((resolved[name], action == PRESS),))
+        offsets_ns.append(timestamp_ns - first_ns)
+    cycle_ns = max(event_log.end_ns - first_ns, offsets_ns[-1] + default_ms * NS_PER_MS)
+    return SequencePlan(names=tuple(names),
+                        steps=tuple(steps),
+                        offsets_ns=tuple(offsets_ns),
+                        cycle_ns=cycle_ns)
+
+
+class _Cursor:
+    """The step a ProgramPlan is at, with its neighbours, advanced in play order
+
+    Moving to the next step takes one generator step; any other move
+    locates the step in the program tree. Only the playback thread may
+    use it.
+    """
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.length = len(plan.program)
+        self.first_leaf = plan.program.leaf_index(0)
+        self._jump(0)
+
+    def seek(self, i):
+        if i == self.position:
+            return
+        if i == self.position + 1 and i < self.length:
+            self.previous = self.leaf
+            self.leaf = self.next
+            self.offset_ns += self.plan.delays_ns[self.previous]
+            self.next = next(self._indexes, self.first_leaf)  # Wraps to the next cycle
+            self.position = i
+            return
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError(i)
+        self._jump(i)
+
+    def _jump(self, i):
+        program = self.plan.program
+        self.leaf = program.leaf_index(i)
+        self.previous = program.leaf_index(i - 1)  # -1 wraps to the last step
+        self._indexes = program.indexes(i + 1)
+        self.next = next(self._indexes, self.first_leaf)
+        self.offset_ns = program.offset_ns(i, self.plan.delays_ns, self.plan.durations)
+        self.position = i
+
+
+class _ProgramView:
+    def __init__(self, plan):
+        self._plan = plan
+        self._cursor = plan._cursor
+
+    def __len__(self):
+        return self._cursor.length
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class _StepView(_ProgramView):
+    """steps[i]: the events of step i, given its neighbours"""
+
+    def __getitem__(self, i):
+        cursor = self._cursor
+        cursor.seek(i)
+        return self._plan.events_at(cursor)[0]
+
+
+class _ReleaseView(_ProgramView):
+    def __getitem__(self, i):
+        cursor = self._cursor
+        cursor.seek(i)
+        return self._plan.events_at(cursor)[1]
+
+
+class _OffsetView(_ProgramView):
+    def __getitem__(self, i):
+        cursor = self._cursor
+        cursor.seek(i)
+        return cursor.offset_ns
+
+
+class _NameView:
+    """names[i]; looks the step up without the cursor, so any thread may read it"""
+
+    def __init__(self, program):
+        self._program = program
+
+    def __len__(self):
+        return len(self._program)
+
+    def __getitem__(self, i):
+        return self._program.leaves[self._program.leaf_index(i)].label
+
+    def __iter__(self):
+        leaves = self._program.leaves
+        for i in self._program.indexes():
+            yield leaves[i].label
+
+
+class ProgramPlan:
+    """A SequencePlan look-alike that expands a Program while it plays
+
+    ``steps``, ``offsets_ns`` and ``release_after`` are views computed
+    step by step from the program tree, so memory stays proportional to
+    the text, not to the number of steps played. A step's events depend
+    on its own modifiers and those of the neighbours it is joined to (see
+    sequence.compile_events); they are compiled once per distinct
+    (previous, step, next) combination and cached.
+    """
+
+    def __init__(self, program, delays_ms, resolve_key, hold_modifiers=True):
+        self.program = program
+        self.resolve_key = resolve_key
+        self.delays_ns = [delay * NS_PER_MS for delay in delays_ms]
+        self.durations = program.durations(self.delays_ns)
+        self.cycle_ns = self.durations[id(program.root)]
+        self.hold_modifiers = hold_modifiers
+        self._max_gap_ns = HOLD_MAX_GAP_MS * NS_PER_MS
+        self._resolved = {}
+        for step in program.leaves:
+            self._key_of(step.key)
+            for mod in step.modifiers:
+                self._key_of(mod)
+        self._events = {}
+        self._cursor = _Cursor(self)
+        self.names = _NameView(program)
+        self.steps = _StepView(self)
+        self.offsets_ns = _OffsetView(self)
+        self.release_after = _ReleaseView(self)
+        self.first_step = self.steps[0]  # Nothing is held at the start of a cycle
+
+    def __len__(self):
+        return len(self.program)
+
+    def _key_of(self, name):
+        if name not in self._resolved:
+            self._resolved[name] = self.resolve_key(name)
+        return self._resolved[name]
+
+    def _joined(self, leaf):
+        """True if leaf ``leaf`` may leave modifiers down for the step after it"""
+        return self.hold_modifiers and self.delays_ns[leaf] <= self._max_gap_ns
+
+    def events_at(self, cursor):
+        """(events, release) of the step at ``cursor``; nothing is held across a cycle's end"""
+        previous = cursor.previous if cursor.position > 0 and self._joined(cursor.previous) else None
+        following = cursor.next if cursor.position < cursor.length - 1 and self._joined(cursor.leaf) else None
+        return self.events(previous, cursor.leaf, following)
+
+    def events(self, previous, leaf, following):
+        """(events, release) of leaf ``leaf`` between the leaves ``previous`` and ``following``
+
+        None for a neighbour means the step is not joined to it.
+        """
+        cache_key = (previous, leaf, following)
+        events = self._events.get(cache_key)
+        if events is None:
+            leaves = self.program.leaves
+            held_before = () if previous is None else leaves[previous].modifiers
+            held_after = () if following is None else leaves[following].modifiers
+            events = self._events[cache_key] = step_events(leaves[leaf], held_before, held_after, self._key_of)
+        return events
+
+
+class PlanCache:
+    """Keeps the last compiled plan until its inputs are edited
+
+    The owner calls ``invalidate()`` whenever the combination or a delay
+    changes; until then ``current()`` hands back the same plan without the
+    owner having to read its inputs again.
+    """
+
+    def __init__(self, resolve_key):
+        self.resolve_key = resolve_key
+        self._key = None
+        self._plan = None
+        self.is_valid = False
+
+    def current(self):
+        """The cached plan, or None if it has been invalidated"""
+        return self._plan if self.is_valid else None
+
+    def get(self, combo_text, timing_intervals):
+        """Return the plan for these inputs, compiling only if they changed"""
+        key = (combo_text.strip(), tuple(timing_intervals))
+        if key != self._key:
+            self._plan = compile_plan(combo_text, timing_intervals, self.resolve_key)
+            self._key = key
+        self.is_valid = True
+        return self._plan
+
+    def invalidate(self):
+        """Mark the inputs as edited"""
+        self.is_valid = False
+
+    def clear(self):
+        """Drop the cached plan, e.g. when key objects must be resolved again"""
+        self._key = None
+        self._plan = None
+        self.is_valid = False
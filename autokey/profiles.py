@@ -0,0 +1,17 @@
+"""Motion profile names, importable without NumPy
+
+motion.py computes the profiles and needs NumPy, which the GUI only
+loads once a profiled run starts. The profile combo box is filled from
+here instead.
+"""
+
+
+CONSTANT = 'constant'
+TRAPEZOIDAL = 'trapezoidal'
+S_CURVE = 's_curve'
+
+PROFILES = {
+    CONSTANT: "Constant",
+    TRAPEZOIDAL: "Trapezoidal",
+    S_CURVE: "S-curve",
+}
@@ -0,0 +1,203 @@
+"""Timestamped key recording"""
+from array import array
+
+from .sequence import is_modifier, key_label
+from .telemetry import PRESS
+
+
+class EventLog:
+    """Compact array-backed log of recorded press/release events
+
+    Timestamps are perf_counter_ns values. Key names are interned into
+    ``key_names`` and each event stores only the name's index, so a long
+    recording costs 11 bytes per event instead of a Python tuple.
+    """
+
+    def __init__(self):
+        self.timestamps_ns = array('q')
+        self.key_ids = array('H')
+        self.actions = array('b')
+        self.key_names = []
+        self._key_ids = {}
+        self._down = set()
+        self.start_ns = 0
+        self.end_ns = 0
+
+    def __len__(self):
+        return len(self.timestamps_ns)
+
+    def clear(self, start_ns=0):
+        """Forget all events and start a new recording at ``start_ns``"""
+        del self.timestamps_ns[:]
+        del self.key_ids[:]
+        del self.actions[:]
+        self.key_names.clear()
+        self._key_ids.clear()
+        self._down.clear()
+        self.start_ns = start_ns
+        self.end_ns = start_ns
+
+    def _key_id(self, key_name):
+        key_id = self._key_ids.get(key_name)
+        if key_id is None:
+            key_id = self._key_ids[key_name] = len(self.key_names)
+            self.key_names.append(key_name)
+        return key_id
+
+    def append(self, key_name, action, timestamp_ns):
+        """Log one event; OS auto-repeat presses of a held key are dropped
+
+        Returns False if the event was dropped.
+        """
+        key_id = self._key_id(key_name)
+        if action == PRESS:
+            if key_id in self._down:
+                return False
+            self._down.add(key_id)
+        else:
+            self._down.discard(key_id)
+        self.timestamps_ns.append(timestamp_ns)
+        self.key_ids.append(key_id)
+        self.actions.append(action)
+        return True
+
+    def finish(self, end_ns):
+        """Mark the end of the recording (the stop key press)"""
+        self.end_ns = end_ns
+
+    def events(self):
+        """Yield (key_name, action, timestamp_ns) in recorded order"""
+        names = self.key_names
+        for key_id, action, timestamp_ns in zip(self.key_ids, self.actions, self.timestamps_ns):
+            yield names[key_id], action, timestamp_ns
+
+    def steps(self):
+        """The recording as combination steps: [(label, press_ns)]
+
+        A key pressed while modifiers are down becomes a chord step such as
+        ``ctrl_l+c``; a modifier pressed and released on its own is a step
+        by itself. Keys whose characters are part of the combination
+        grammar are labelled by name (see sequence.KEY_NAMES).
+        """
+        steps = []
+        held = []  # (name, press_ns, used_in_chord)
+        for name, action, timestamp_ns in self.events():
+            if is_modifier(name):
+                if action == PRESS:
+                    held.append([name, timestamp_ns, False])
+                    continue
+                for i, (held_name, press_ns, used) in enumerate(held):
+                    if held_name == name:
+                        del held[i]
+                        if not used:
+                            label = '+'.join([h[0] for h in held[:i]] + [name])
+                            steps.append((label, press_ns))
+                        break
+            elif action == PRESS:
+                for h in held:
+                    h[2] = True
+                steps.append(('+'.join([h[0] for h in held] + [key_label(name)]), timestamp_ns))
+        steps.sort(key=lambda step: step[1])
+        return steps
+
+    def combination(self):
+        """The recording as a combination string
+
+        Plain sequences keep the '+'-joined form; once a chord is involved
+        steps are separated by ', ' so the chords parse back unchanged.
+        """
+        labels = [label for label, _ in self.steps()]
+        if any('+' in label for label in labels):
+            return ', '.join(labels)
+        return '+'.join(labels)
+
+    def intervals_ms(self, default_ms=100):
+        """Measured delay after each step, in ms, for the timing table
+
+        Row ``i`` is the time from step ``i`` to step ``i + 1``; the last
+        row runs until the stop key, which is where the next repeat would
+        start. Rounded to whole ms and never below 1 ms.
+        """
+        press_times = [press_ns for _, press_ns in self.steps()]
+        if not press_times:
+            return []
+        press_times.append(self.end_ns if self.end_ns > press_times[-1] else press_times[-1] + default_ms * 1_000_000)
+        return [max(1, round((b - a) / 1_000_000)) for a, b in zip(press_times, press_times[1:])]
+
+
+STOP = 2  # Marker action: the stop key was pressed
+
+
+class EventRing:
+    """Bounded single-producer/single-consumer queue of key events
+
+    The pynput listener thread is the only producer and the GUI thread the
+    only consumer, so no lock is needed: the producer writes a slot and only
+    then advances ``_tail``, the consumer reads up to ``_tail`` and then
+    advances ``_head``. Each index is written by one thread only, and a
+    plain int store is atomic in CPython. ``push`` never blocks; if the
+    consumer falls a whole ring behind the event is counted in
+    ``overflows`` instead of stalling the OS input path.
+
+    Keys are stored as small ints. ``key_id`` interns the listener's key
+    objects on the producer side; the consumer looks them up in ``keys``.
+    """
+
+    def __init__(self, capacity=1 << 16):
+        if capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self.timestamps_ns = array('q', bytes(8 * capacity))
+        self.key_ids = array('i', bytes(4 * capacity))
+        self.actions = array('b', bytes(capacity))
+        self.keys = []
+        self._key_ids = {}
+        self._head = 0
+        self._tail = 0
+        self.overflows = 0
+
+    def reset(self):
+        """Empty the ring; only call while no producer is running"""
+        self._head = self._tail = 0
+        self.overflows = 0
+        self.keys = []
+        self._key_ids = {}
+
+    def key_id(self, key):
+        """Producer side: small int for a key object"""
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            # Publish the key before its id can appear in the ring
+            self.keys.append(key)
+            key_id = self._key_ids[key] = len(self.keys) - 1
+        return key_id
+
+    def push(self, key, action, timestamp_ns):
+        """Producer side: enqueue one event; False if the ring is full"""
+        tail = self._tail
+        if tail - self._head >= self.capacity:
+            self.overflows += 1
+            return False
+        i = tail & self._mask
+        self.key_ids[i] = self.key_id(key) if key is not None else -1
+        self.actions[i] = action
+        self.timestamps_ns[i] = timestamp_ns
+        self._tail = tail + 1
+        return True
+
+    def __len__(self):
+        return self._tail - self._head
+
+    def drain(self):
+        """Consumer side: take every queued event as a list of (key, action, timestamp_ns)"""
+        head, tail = self._head, self._tail
+        mask = self._mask
+        keys, key_ids, actions, timestamps_ns = self.keys, self.key_ids, self.actions, self.timestamps_ns
+        batch = []
+        for n in range(head, tail):
+            i = n & mask
+            key_id = key_ids[i]
+            batch.append(((keys[key_id] if key_id >= 0 else None), actions[i], timestamps_ns[i]))
+        self._head = tail
+        return batch
@@ -0,0 +1,145 @@
+"""Absolute-deadline timing for repeating key sequences"""
+import sys
+import time
+
+
+NS_PER_MS = 1_000_000
+
+# The last stretch before a deadline is spun instead of slept, because
+# sleep/queue timeouts wake up late by up to a scheduler tick. Windows
+# ticks are much coarser than Linux/macOS ones.
+SPIN_THRESHOLD_NS = 16 * NS_PER_MS if sys.platform == 'win32' else 2 * NS_PER_MS
+
+
+def offsets_from_intervals(timing_intervals, key_count, default_ms=100):
+    """Turn per-key delays in ms into (offsets_ns, cycle_ns)
+
+    Key ``i`` is sent ``offsets_ns[i]`` after the start of its cycle and a
+    cycle lasts the sum of all delays. Missing delays use ``default_ms``.
+    """
+    offsets_ns = []
+    elapsed_ns = 0
+    for i in range(key_count):
+        offsets_ns.append(elapsed_ns)
+        delay_ms = timing_intervals[i] if i < len(timing_intervals) else default_ms
+        elapsed_ns += int(delay_ms) * NS_PER_MS
+    return tuple(offsets_ns), elapsed_ns
+
+
+class DeadlineScheduler:
+    """Computes every key's deadline against one monotonic start time
+
+    Deadlines are never derived from the previous key's actual send time,
+    so a late key does not push the rest of the run back: the next wait is
+    simply shorter. Error stays bounded by a single key instead of growing
+    with the number of repeats.
+    """
+
+    def __init__(self, offsets_ns, cycle_ns):
+        self.offsets_ns = offsets_ns
+        self.cycle_ns = cycle_ns
+        self.start_ns = 0
+
+    def begin(self, now_ns=None):
+        """Anchor the schedule at ``now_ns`` (defaults to now)"""
+        self.start_ns = time.perf_counter_ns() if now_ns is None else now_ns
+        return self.start_ns
+
+    def deadline(self, cycle, index):
+        """Absolute perf_counter_ns deadline of key ``index`` in ``cycle``"""
+        return self.start_ns + cycle * self.cycle_ns + self.offsets_ns[index]
+
+    def shift(self, delta_ns):
+        """Move all remaining deadlines later, e.g. by the time spent paused"""
+        self.start_ns += delta_ns
+
+    def duration_ns(self, repeats):
+        """Nominal time from the first key to the last key of ``repeats`` cycles"""
+        if repeats <= 0:
+            return 0
+        return (repeats - 1) * self.cycle_ns + self.offsets_ns[-1]
+
+
+class ProfiledScheduler(DeadlineScheduler):
+    """DeadlineScheduler whose cycles each have their own length
+
+    ``cycle_lengths_ns`` is an iterable of cycle lengths (see
+    motion.MotionTimeline.cycle_lengths), consumed lazily one cycle at a
+    time, so a run of any length needs constant memory. The plan's offsets
+    are stretched or squeezed in proportion, so every key keeps its place
+    within the cycle. Deadlines still come from one start time; cycles must
+    be asked for in order.
+    """
+
+    def __init__(self, offsets_ns, cycle_ns, cycle_lengths_ns):
+        super().__init__(offsets_ns, cycle_ns)
+        self._lengths = iter(cycle_lengths_ns)
+        self._cycle = 0
+        self._cycle_start_ns = 0
+        self._cycle_length_ns = next(self._lengths, cycle_ns)
+
+    def deadline(self, cycle, index):
+        while self._cycle < cycle:
+            self._cycle_start_ns += self._cycle_length_ns
+            self._cycle_length_ns = next(self._lengths, self.cycle_ns)
+            self._cycle += 1
+        offset_ns = self.offsets_ns[index]
+        if offset_ns:
+            offset_ns = offset_ns * self._cycle_length_ns // self.cycle_ns
+        return self.start_ns + self._cycle_start_ns + offset_ns
+
+
+class TokenBucketScheduler(DeadlineScheduler):
+    """Burst mode: ignores the plan's delays and sends steps as soon as a token bucket allows
+
+    Tokens refill at ``rate_hz`` steps per second and up to ``burst`` of
+    them can be saved up, so at most ``burst`` steps go out back to back
+    and the sustained rate never exceeds ``rate_hz``. A ``rate_hz`` of 0
+    means no limit: every step is sent as soon as the previous one returns.
+
+    The bucket is kept as the GCRA theoretical arrival time (``_tat_ns``)
+    rather than a token count. A step's deadline is taken the first time
+    it is asked for and depends on when that is, so deadlines must be
+    asked for in order, like ProfiledScheduler's.
+    """
+
+    def __init__(self, rate_hz, burst=1):
+        super().__init__((0,), 0)
+        self.rate_hz = rate_hz
+        self.interval_ns = int(1e9 / rate_hz) if rate_hz > 0 else 0
+        self.tolerance_ns = (max(burst, 1) - 1) * self.interval_ns
+        self._tat_ns = 0
+        self._cycle = -1
+        self._index = -1
+        self._deadline_ns = 0
+
+    def begin(self, now_ns=None):
+        start_ns = super().begin(now_ns)
+        self._tat_ns = start_ns
+        self._cycle = self._index = -1
+        return start_ns
+
+    def deadline(self, cycle, index):
+        if cycle != self._cycle or index != self._index:
+            send_ns = max(self._tat_ns - self.tolerance_ns, time.perf_counter_ns())
+            self._tat_ns = max(self._tat_ns, send_ns) + self.interval_ns
+            self._cycle, self._index = cycle, index
+            self._deadline_ns = send_ns
+        return self._deadline_ns
+
+    def shift(self, delta_ns):
+        super().shift(delta_ns)
+        self._tat_ns += delta_ns
+        self._deadline_ns += delta_ns
+
+
+def spin_until(deadline_ns, abort=None):
+    """Busy-wait the final stretch, yielding the GIL on every iteration
+
+    Returns False as soon as the optional ``abort`` Event is set.
+    """
+    while time.perf_counter_ns() < deadline_ns:
+        if abort is not None and abort.is_set():
+            return False
+        time.sleep(0)
+    return True
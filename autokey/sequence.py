@@ -0,0 +1,404 @@
+"""Combination grammar: chords, sequences and the press/release events they compile to
+
+A combination is a list of groups separated by ','; within a group keys
+are joined with '+'. Modifier keys are held for the keys that follow them
+in the same group, every other key is one step (a tap)::
+
+    a+b+c            three steps: a, b, c
+    ctrl+c           one step: c with ctrl held
+    ctrl+c, down*3   ctrl+c, then down three times
+    ctrl+c+v         ctrl+c then ctrl+v (ctrl stays down in between if they are close)
+    alt+shift        modifiers alone: shift tapped with alt held
+    (tab+down)*20    tab, down, tab, down, ... twenty times
+    ctrl+(c, v)      modifiers before a group are held for all of it
+    enter@250ms      enter, then 250 ms to the next step
+
+``*N`` after a key or a parenthesised group repeats it N times; groups
+nest. ``@N`` or ``@Nms`` after a key fixes the delay after that step,
+overriding the timing table. Characters the grammar uses are written by
+name (``comma``, ``plus``, ``paren_left``, ...; see KEY_NAMES), and
+key_label() gives the name to write for any key.
+
+parse_program() turns the text into a Program: the distinct steps as they
+appear in the text (one timing table row each) and a small tree of
+repeats over them. The tree is expanded by a generator, so
+``(down*500, enter)*1000`` stays a few nodes however many steps it plays.
+"""
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+
+
+MODIFIERS = frozenset({
+    'ctrl', 'ctrl_l', 'ctrl_r',
+    'shift', 'shift_l', 'shift_r',
+    'alt', 'alt_l', 'alt_r', 'alt_gr',
+    'cmd', 'cmd_l', 'cmd_r',
+})
+
+# Names for the keys whose characters are part of the grammar
+KEY_NAMES = {
+    'comma': ',',
+    'plus': '+',
+    'paren_left': '(',
+    'paren_right': ')',
+    'asterisk': '*',
+    'at': '@',
+}
+_KEY_LABELS = {char: name for name, char in KEY_NAMES.items()}
+
+HOLD_MAX_GAP_MS = 250  # Longest delay a modifier stays down for between two steps sharing it
+
+# One '*N' or '@N' / '@Nms' suffix at the end of a token
+_SUFFIX = re.compile(r'(\*\s*(\d+)|@\s*(\d+)\s*(?:ms)?)\s*$', re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Step:
+    """One key tapped with a set of modifiers held (in press order)
+
+    ``delay_ms`` comes from an ``@`` suffix; None means the timing table
+    sets the delay after the step.
+    """
+    modifiers: tuple
+    key: str
+    delay_ms: int = None
+
+    @property
+    def label(self):
+        return '+'.join(self.modifiers + (key_label(self.key),))
+
+
+@dataclass(frozen=True, eq=False)
+class Repeat:
+    """``body`` played ``count`` times
+
+    The body holds leaf indexes (ints, into Program.leaves) and nested
+    Repeats; ``starts[c]`` is the step at which child ``c`` begins within
+    one pass over the body.
+    """
+    body: tuple
+    count: int
+    starts: tuple
+    body_length: int
+
+    @property
+    def length(self):
+        return self.body_length * self.count
+
+
+def _repeat(body, count):
+    starts = []
+    length = 0
+    for child in body:
+        starts.append(length)
+        length += 1 if child.__class__ is int else child.length
+    return Repeat(tuple(body), count, tuple(starts), length)
+
+
+class Program:
+    """A parsed combination: its steps in text order and the tree that plays them
+
+    ``len(program)`` is the number of steps one cycle plays. Steps are
+    numbered in play order; ``leaf_index(i)`` and ``indexes(start)`` map
+    them to ``leaves`` without expanding the tree.
+    """
+
+    def __init__(self, leaves, body):
+        self.leaves = tuple(leaves)
+        self.root = _repeat(body, 1)
+
+    def __len__(self):
+        return self.root.length
+
+    @property
+    def is_flat(self):
+        """True if every step plays exactly once, in text order"""
+        return len(self) == len(self.leaves)
+
+    def _locate(self, node, i):
+        """(iteration, child index, step within the child) of step ``i`` of ``node``"""
+        iteration, i = divmod(i, node.body_length)
+        c = bisect_right(node.starts, i) - 1
+        return iteration, c, i - node.starts[c]
+
+    def leaf_index(self, i):
+        """Leaf index of step ``i`` (negative counts from the end)"""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        node = self.root
+        while True:
+            _, c, i = self._locate(node, i)
+            child = node.body[c]
+            if child.__class__ is int:
+                return child
+            node = child
+
+    def indexes(self, start=0):
+        """Yield the leaf index of every step from ``start`` to the end of the cycle"""
+        if start < len(self):
+            yield from self._iterate(self.root, start)
+
+    def _iterate(self, node, skip):
+        body = node.body
+        iteration, c, skip = self._locate(node, skip)
+        for _ in range(iteration, node.count):
+            for k in range(c, len(body)):
+                child = body[k]
+                if child.__class__ is int:
+                    yield child
+                else:
+                    yield from self._iterate(child, skip)
+                skip = 0
+            c = 0
+
+    def durations(self, delays_ns):
+        """Time of one pass over each Repeat's body, keyed by id(), for ``offset_ns``"""
+        durations = {}
+
+        def measure(node):
+            total = 0
+            for child in node.body:
+                total += delays_ns[child] if child.__class__ is int else measure(child) * child.count
+            durations[id(node)] = total
+            return total
+
+        measure(self.root)
+        return durations
+
+    def offset_ns(self, i, delays_ns, durations):
+        """Time from the start of the cycle to step ``i``: the delays of every step before it"""
+        offset_ns = 0
+        node = self.root
+        while True:
+            iteration, c, i = self._locate(node, i)
+            offset_ns += iteration * durations[id(node)]
+            for child in node.body[:c]:
+                offset_ns += delays_ns[child] if child.__class__ is int else durations[id(child)] * child.count
+            child = node.body[c]
+            if child.__class__ is int:
+                return offset_ns
+            node = child
+
+
+def is_modifier(key_name):
+    return key_name.lower() in MODIFIERS
+
+
+def key_label(key_name):
+    """How a key is written in a combination: its name if its character is part of the grammar"""
+    return _KEY_LABELS.get(key_name, key_name)
+
+
+def _split_suffixes(token):
+    """'down*3@20ms' -> ('down', 3, 20); a bare '*' or '@' is the key itself"""
+    count, delay_ms = 1, None
+    while True:
+        match = _SUFFIX.search(token)
+        if match is None or not token[:match.start()].strip():
+            return token.strip(), count, delay_ms
+        if match.group(2) is not None:
+            count *= int(match.group(2))
+        elif delay_ms is None:
+            delay_ms = int(match.group(3))
+        token = token[:match.start()]
+
+
+class _Parser:
+    """Recursive descent over the combination text, collecting leaves as it goes"""
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+        self.leaves = []
+
+    def parse(self):
+        body = self.combination(())
+        if self.pos < len(self.text):
+            raise ValueError(f"Unmatched ')' at position {self.pos + 1}")
+        return Program(self.leaves, body)
+
+    def combination(self, outer):
+        """Groups separated by ',' up to a ')' or the end; returns tree nodes"""
+        nodes = []
+        while True:
+            nodes.extend(self.group(outer))
+            if self.pos < len(self.text) and self.text[self.pos] == ',':
+                self.pos += 1
+                continue
+            return nodes
+
+    def group(self, outer):
+        """Items joined by '+'"""
+        start = self.pos
+        items = [self.item()]
+        while self.pos < len(self.text) and self.text[self.pos] == '+':
+            self.pos += 1
+            items.append(self.item())
+        text = self.text[start:self.pos].strip()
+        if not text:
+            return []
+        if not all(items):
+            raise ValueError(f"Empty key in '{text}'")
+
+        nodes = []
+        held = list(outer)
+        tapped = False
+        for item in items:
+            if item[0] == 'group':
+                _, group_start, group_end, count = item
+                # Parse the group again with this group's modifiers held
+                saved = self.pos
+                self.pos = group_start
+                body = self.combination(tuple(held))
+                self.pos = saved
+                if count == 1:
+                    nodes.extend(body)
+                elif body:
+                    nodes.append(_repeat(body, count))
+                tapped = True
+                continue
+            _, name, count, delay_ms = item
+            if is_modifier(name) and count == 1 and delay_ms is None:
+                if name not in held:
+                    held.append(name)
+                continue
+            nodes.append(self.leaf(Step(tuple(held), name, delay_ms), count))
+            tapped = True
+        if not tapped:
+            # Only modifiers: tap the last one with the others held
+            nodes.append(self.leaf(Step(tuple(held[:-1]), held[-1]), 1))
+        return nodes
+
+    def leaf(self, step, count):
+        self.leaves.append(step)
+        index = len(self.leaves) - 1
+        return index if count == 1 else _repeat((index,), count)
+
+    def item(self):
+        """A key or a parenthesised group, with its suffixes; None if empty"""
+        text = self.text
+        while self.pos < len(text) and text[self.pos].isspace():
+            self.pos += 1
+        if self.pos < len(text) and text[self.pos] == '(':
+            return self.parenthesised()
+        start = self.pos
+        while self.pos < len(text) and text[self.pos] not in ',+()':
+            self.pos += 1
+        if self.pos < len(text) and text[self.pos] == '(':
+            raise ValueError(f"Unexpected '(' at position {self.pos + 1}")
+        token = text[start:self.pos].strip()
+        if not token:
+            return None
+        name, count, delay_ms = _split_suffixes(token)
+        if not count:
+            raise ValueError(f"Repeat count must be at least 1 in '{token}'")
+        return ('key', KEY_NAMES.get(name.lower(), name), count, delay_ms)
+
+    def parenthesised(self):
+        text = self.text
+        open_pos = self.pos
+        self.pos += 1
+        # Skip over the body now; group() parses it once the held modifiers are known
+        depth = 1
+        while self.pos < len(text) and depth:
+            if text[self.pos] == '(':
+                depth += 1
+            elif text[self.pos] == ')':
+                depth -= 1
+            self.pos += 1
+        if depth:
+            raise ValueError(f"Unclosed '(' at position {open_pos + 1}")
+        body_start, body_end = open_pos + 1, self.pos - 1
+        if not text[body_start:body_end].strip():
+            raise ValueError(f"Empty group at position {open_pos + 1}")
+        start = self.pos
+        while self.pos < len(text) and text[self.pos] not in ',+()':
+            self.pos += 1
+        suffix = text[start:self.pos].strip()
+        name, count, delay_ms = _split_suffixes('_' + suffix)
+        if name != '_':
+            raise ValueError(f"Unexpected '{suffix}' after ')'")
+        if delay_ms is not None:
+            raise ValueError("'@' delays go on single keys, not on groups")
+        if not count:
+            raise ValueError("Repeat count must be at least 1")
+        return ('group', body_start, body_end, count)
+
+
+def parse_program(combo_text):
+    """Parse a combination into a Program; raises ValueError on bad syntax"""
+    return _Parser(combo_text).parse()
+
+
+def parse_steps(combo_text):
+    """Parse a combination into the full list of Steps it plays
+
+    This expands every repeat; use parse_program() for combinations that
+    may be long once expanded.
+    """
+    program = parse_program(combo_text)
+    return [program.leaves[i] for i in program.indexes()]
+
+
+def step_events(step, previous, following, key_of):
+    """Events of one step between neighbours holding ``previous`` and ``following``
+
+    Returns ``(events, release)``: the step's (key, is_press) group, which
+    presses only the modifiers ``previous`` did not leave down and releases
+    only those ``following`` does not need, and the release group for
+    whatever it leaves held.
+    """
+    key = key_of(step.key)
+    presses = [(key_of(mod), True) for mod in step.modifiers if mod not in previous]
+    body = [(key, True), (key, False)]
+    body += [(key_of(mod), False) for mod in reversed(step.modifiers) if mod not in following]
+    release = tuple((key_of(mod), False) for mod in reversed(step.modifiers) if mod in following)
+    return tuple(presses + body), release
+
+
+def compile_events(steps, resolve_key, hold_modifiers=True, delays_ms=None):
+    """Compile Steps into per-step press/release groups with minimal modifier toggles
+
+    Returns ``(first_step, cycle_steps, release_after)``:
+
+    - ``cycle_steps[i]`` is the (key, is_press) group for step ``i`` in a
+      repeating cycle. A modifier shared with the next step stays down
+      for it when the two are back to back: inside one cycle and, given
+      ``delays_ms``, at most HOLD_MAX_GAP_MS apart. Nothing is held
+      across the end of a cycle, so an ``alt+tab`` cycle lets go of alt
+      every time and no modifier stays down through a long idle gap.
+    - ``first_step`` is the group for step 0, which never finds anything
+      held; it equals ``cycle_steps[0]``.
+    - ``release_after[i]`` releases whatever is still held after step
+      ``i``; send it when a run ends or pauses there.
+
+    With ``hold_modifiers=False`` every step presses and releases its own
+    modifiers, so nothing is left down between steps. Use that when other
+    sequences are sent in between (see multi.py).
+    """
+    resolved = {}
+
+    def key_of(name):
+        if name not in resolved:
+            resolved[name] = resolve_key(name)
+        return resolved[name]
+
+    count = len(steps)
+
+    def joined(i):
+        """True if step ``i`` may leave modifiers down for step ``i + 1``"""
+        if not hold_modifiers or i + 1 >= count:
+            return False
+        return delays_ms is None or delays_ms[i] <= HOLD_MAX_GAP_MS
+
+    cycle_steps, release_after = [], []
+    for i, step in enumerate(steps):
+        previous = steps[i - 1].modifiers if i > 0 and joined(i - 1) else ()
+        following = steps[i + 1].modifiers if joined(i) else ()
+        events, release = step_events(step, previous, following, key_of)
+        cycle_steps.append(events)
+        release_after.append(release)
+    return cycle_steps[0], tuple(cycle_steps), tuple(release_after)
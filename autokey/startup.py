@@ -0,0 +1,54 @@
+"""Startup phase timing"""
+import os
+import sys
+import time
+
+
+PROFILE_FLAG = '--profile-startup'
+PROFILE_ENV = 'AUTOKEY_PROFILE_STARTUP'
+
+
+def profiling_requested(argv):
+    """True if startup timing was asked for on the command line or in the environment"""
+    return PROFILE_FLAG in argv or os.environ.get(PROFILE_ENV, '') not in ('', '0')
+
+
+class StartupProfiler:
+    """Splits startup into consecutive phases
+
+    Each ``mark(phase)`` records the time since the previous mark (or since
+    ``origin_ns``), so the phases add up to the total time-to-interactive.
+    A disabled profiler does nothing.
+    """
+
+    def __init__(self, enabled=True, origin_ns=None):
+        self.enabled = enabled
+        self.origin_ns = time.perf_counter_ns() if origin_ns is None else origin_ns
+        self._last_ns = self.origin_ns
+        self.phases = []
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        self.phases.append((phase, now - self._last_ns))
+        self._last_ns = now
+
+    @property
+    def total_ms(self):
+        return (self._last_ns - self.origin_ns) / 1e6
+
+    def report(self):
+        """Multi-line table of phase and cumulative times"""
+        lines = ["Startup timing:"]
+        elapsed_ns = 0
+        for phase, duration_ns in self.phases:
+            elapsed_ns += duration_ns
+            lines.append(f"  {phase:<14}{duration_ns / 1e6:9.1f} ms{elapsed_ns / 1e6:10.1f} ms")
+        return '\n'.join(lines)
+
+
+def resource_path(relative_path):
+    """Absolute path of a bundled resource, in a source checkout or a PyInstaller build"""
+    base = getattr(sys, '_MEIPASS', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(base, relative_path)
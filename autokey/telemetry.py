@@ -0,0 +1,155 @@
+"""Per-keystroke timing telemetry"""
+import csv
+import json
+from array import array
+
+
+PRESS = 0
+RELEASE = 1
+ACTION_NAMES = ('press', 'release')
+
+DEFAULT_CAPACITY = 1 << 18  # 262144 events, about 5 MB
+
+
+class TimingRecorder:
+    """Fixed-size ring buffer of (intended, actual) keystroke timestamps
+
+    The playback thread calls ``record()`` once per injected press or
+    release, or ``record_step()`` once per step. Storage is preallocated
+    ``array`` columns indexed with a mask, so recording allocates nothing
+    and costs a handful of stores. Once the buffer is full the oldest
+    events are overwritten; ``dropped`` says how many. Statistics are
+    computed from a snapshot on the reader's side.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self.intended_ns = array('q', bytes(8 * capacity))
+        self.actual_ns = array('q', bytes(8 * capacity))
+        self.key_index = array('i', bytes(4 * capacity))
+        self.action = array('b', bytes(capacity))
+        self.count = 0
+        self.start_ns = 0
+        self.key_names = ()
+
+    def reset(self, start_ns, key_names=()):
+        """Start a new run; previous events are discarded"""
+        self.count = 0
+        self.start_ns = start_ns
+        self.key_names = key_names  # Any sequence indexed by step; not copied
+
+    def record(self, intended_ns, actual_ns, key_index, action):
+        """Store one event; called from the playback thread"""
+        i = self.count & self._mask
+        self.intended_ns[i] = intended_ns
+        self.actual_ns[i] = actual_ns
+        self.key_index[i] = key_index
+        self.action[i] = action
+        self.count += 1
+
+    def record_step(self, intended_ns, sent_ns, done_ns, key_index, ops):
+        """Store the events of one step sent as a single backend call
+
+        The backend gets the whole step at once, so per-event times are not
+        taken inside the call: the events are spread evenly between
+        ``sent_ns`` and ``done_ns``, like the overhead model assumes.
+        """
+        n = len(ops)
+        step_ns = done_ns - sent_ns
+        for k, (_, is_press) in enumerate(ops):
+            self.record(intended_ns, sent_ns + step_ns * k // n, key_index, PRESS if is_press else RELEASE)
+
+    @property
+    def dropped(self):
+        """Events overwritten because the run outgrew the buffer"""
+        return max(0, self.count - self.capacity)
+
+    def snapshot(self):
+        """Copy out the buffered events, oldest first
+
+        Returns (intended_ns, actual_ns, key_index, action) lists.
+        """
+        count = self.count
+        size = min(count, self.capacity)
+        first = (count - size) & self._mask
+        columns = []
+        for column in (self.intended_ns, self.actual_ns, self.key_index, self.action):
+            if first + size <= self.capacity:
+                columns.append(column[first:first + size].tolist())
+            else:
+                columns.append(column[first:].tolist() + column[:first + size - self.capacity].tolist())
+        return tuple(columns)
+
+    def lateness_ns(self):
+        """Lateness of every buffered press, in ns"""
+        intended, actual, _, action = self.snapshot()
+        return [a - t for t, a, kind in zip(intended, actual, action) if kind == PRESS]
+
+    def stats(self):
+        """Summary of press lateness and the achieved press rate"""
+        intended, actual, _, action = self.snapshot()
+        press_times = [a for a, kind in zip(actual, action) if kind == PRESS]
+        lateness = sorted(a - t for t, a, kind in zip(intended, actual, action) if kind == PRESS)
+        if not lateness:
+            return None
+        n = len(lateness)
+        span_ns = press_times[-1] - press_times[0]
+        return {
+            'presses': n,
+            'dropped': self.dropped,
+            'mean_us': sum(lateness) / n / 1000.0,
+            'p50_us': lateness[(n - 1) // 2] / 1000.0,
+            'p99_us': lateness[min(n - 1, int(n * 0.99))] / 1000.0,
+            'max_us': lateness[-1] / 1000.0,
+            'rate_hz': (n - 1) * 1e9 / span_ns if span_ns > 0 else 0.0,
+        }
+
+    def histogram(self, bin_us=100, bins=50):
+        """Press lateness counts in ``bin_us`` buckets; the last bucket is open-ended"""
+        counts = [0] * bins
+        bin_ns = bin_us * 1000
+        for late in self.lateness_ns():
+            counts[min(bins - 1, max(0, late) // bin_ns)] += 1
+        return {'bin_us': bin_us, 'counts': counts}
+
+    def rows(self):
+        """Buffered events as dicts relative to the run start"""
+        intended, actual, key_index, action = self.snapshot()
+        names = self.key_names
+        for t, a, k, kind in zip(intended, actual, key_index, action):
+            yield {
+                'key': names[k] if k < len(names) else str(k),
+                'action': ACTION_NAMES[kind],
+                'intended_ns': t - self.start_ns,
+                'actual_ns': a - self.start_ns,
+                'lateness_us': (a - t) / 1000.0,
+            }
+
+    def export_csv(self, path):
+        """Write every buffered event to a CSV file"""
+        fields = ['key', 'action', 'intended_ns', 'actual_ns', 'lateness_us']
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(self.rows())
+
+    def export_json(self, path):
+        """Write events, summary statistics and the lateness histogram as JSON"""
+        report = {
+            'stats': self.stats(),
+            'histogram': self.histogram(),
+            'events': list(self.rows()),
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=1)
+
+
+def format_stats(stats):
+    """One-line summary for the status area"""
+    if not stats:
+        return "No keystrokes recorded yet"
+    return (f"{stats['presses']} presses @ {stats['rate_hz']:.1f}/s | lateness mean {stats['mean_us']:.0f} µs, "
+            f"p50 {stats['p50_us']:.0f} µs, p99 {stats['p99_us']:.0f} µs, max {stats['max_us']:.0f} µs")
@@ -0,0 +1,117 @@
+"""Run tracing in Chrome trace-event format
+
+A TraceBuffer records spans (a kind, start, duration and two integer
+arguments) for one thread into preallocated ``array`` columns, the same
+way TimingRecorder stores keystrokes, so tracing allocates nothing while a
+run is going. ``write_chrome_trace`` turns one buffer per thread into a
+JSON file that chrome://tracing and https://ui.perfetto.dev open directly,
+with each thread on its own track.
+"""
+import json
+from array import array
+
+
+CYCLE = 0
+WAIT = 1
+INJECT = 2
+UI_UPDATE = 3
+STATS_UPDATE = 4
+SPAN_NAMES = ('cycle', 'wait', 'inject', 'ui_update', 'stats_update')
+
+DEFAULT_CAPACITY = 1 << 16  # Spans per thread, about 1.8 MB
+
+
+class TraceBuffer:
+    """Fixed-size ring buffer of spans written by a single thread
+
+    ``index`` is the cycle number for CYCLE spans, the step index for
+    WAIT and INJECT spans and the repeats shown for UI_UPDATE spans.
+    ``value`` is the injection lateness in ns for INJECT spans and
+    otherwise unused. Once full, the oldest spans are overwritten.
+    """
+
+    def __init__(self, thread_name, capacity=DEFAULT_CAPACITY):
+        if capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        self.thread_name = thread_name
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self.kind = array('b', bytes(capacity))
+        self.start_ns = array('q', bytes(8 * capacity))
+        self.duration_ns = array('q', bytes(8 * capacity))
+        self.index = array('i', bytes(4 * capacity))
+        self.value = array('q', bytes(8 * capacity))
+        self.count = 0
+
+    def reset(self):
+        self.count = 0
+
+    def span(self, kind, start_ns, end_ns, index=0, value=0):
+        """Store one finished span"""
+        i = self.count & self._mask
+        self.kind[i] = kind
+        self.start_ns[i] = start_ns
+        self.duration_ns[i] = end_ns - start_ns
+        self.index[i] = index
+        self.value[i] = value
+        self.count += 1
+
+    @property
+    def dropped(self):
+        return max(0, self.count - self.capacity)
+
+    def spans(self):
+        """Buffered spans, oldest first, as (kind, start_ns, duration_ns, index, value)"""
+        count = self.count
+        size = min(count, self.capacity)
+        first = count - size
+        mask = self._mask
+        for n in range(first, count):
+            i = n & mask
+            yield self.kind[i], self.start_ns[i], self.duration_ns[i], self.index[i], self.value[i]
+
+
+def _span_args(kind, index, value):
+    if kind == CYCLE:
+        return {'cycle': index}
+    if kind == INJECT:
+        return {'step': index, 'late_us': value / 1000.0}
+    if kind == WAIT:
+        return {'step': index}
+    if kind == UI_UPDATE:
+        return {'repeats': index}
+    return {}
+
+
+def chrome_trace_events(buffers, origin_ns=None):
+    """Trace-event dicts for the spans of several TraceBuffers, one thread each"""
+    if origin_ns is None:
+        starts = [start_ns for buffer in buffers for _, start_ns, _, _, _ in buffer.spans()]
+        origin_ns = min(starts) if starts else 0
+    events = []
+    for tid, buffer in enumerate(buffers, 1):
+        events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid,
+                       'args': {'name': buffer.thread_name}})
+        for kind, start_ns, duration_ns, index, value in buffer.spans():
+            events.append({
+                'name': SPAN_NAMES[kind],
+                'cat': 'autokey',
+                'ph': 'X',
+                'ts': (start_ns - origin_ns) / 1000.0,
+                'dur': duration_ns / 1000.0,
+                'pid': 1,
+                'tid': tid,
+                'args': _span_args(kind, index, value),
+            })
+    return events
+
+
+def write_chrome_trace(path, buffers, origin_ns=None):
+    """Write the spans of ``buffers`` as a Chrome trace-event JSON file; returns the span count"""
+    events = chrome_trace_events(buffers, origin_ns)
+    dropped = sum(buffer.dropped for buffer in buffers)
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events,
+                   'displayTimeUnit': 'ns',
+                   'otherData': {'dropped_spans': dropped}}, f)
+    return sum(1 for event in events if event['ph'] == 'X')
@@ -0,0 +1,283 @@
+"""Closed-loop delivery verification through a loopback listener
+
+Without it a run only knows that ``press()``/``release()`` did not raise,
+not that the system delivered the key. A DeliveryVerifier gives every
+injected event a sequence number just before it is sent and listens to
+the system's keyboard events with its own pynput listener, which also sees
+injected ones. Each observed event is matched against the outstanding
+sent events with the same key and direction, kept in one FIFO deque per
+(key, press/release): normally the oldest one. If a later send of that key
+fits the usual latency better, the older ones were dropped and count as
+missing. Every sent event is taken off its deque once, so matching is
+amortized O(1) per event. An event not seen within the timeout also counts
+as missing; one seen after an event sent later than it counts as
+reordered; one matching nothing we sent (typing by the user) counts as
+unexpected.
+
+``probe_max_rate`` uses a verifier to find the highest tap rate that is
+still delivered without drops, for burst mode's rate limit.
+"""
+import threading
+import time
+from array import array
+from collections import deque
+
+from .backends import EVDEV_KEYCODES
+from .hotkeys import canonical_key_name, pynput_key_name
+from .scheduler import spin_until
+
+
+DEFAULT_TIMEOUT_MS = 250  # How long an event may take to show up before it counts as missing
+LATENCY_CAPACITY = 1 << 16  # Latency samples kept for the percentiles
+LATENCY_EWMA_SHIFT = 3  # The usual latency moves 1/8 of the way towards each sample
+
+PROBE_TAPS = 200  # Taps per probe trial
+PROBE_START_HZ = 100
+PROBE_MAX_HZ = 20000
+PROBE_PRECISION = 0.1  # Bisection stops once the bracket is within 10%
+
+_EVDEV_NAMES = {}
+for _name, _code in EVDEV_KEYCODES.items():
+    _EVDEV_NAMES.setdefault(_code, _name)
+
+
+def sent_key_name(key):
+    """Canonical name of a key object resolved by any backend"""
+    if isinstance(key, tuple):
+        # uinput: (keycode, needs_shift)
+        return canonical_key_name(_EVDEV_NAMES.get(key[0], str(key[0])))
+    if isinstance(key, str):
+        return canonical_key_name(key)
+    return canonical_key_name(pynput_key_name(key))
+
+
+class DeliveryVerifier:
+    """Matches injected events against what a loopback listener observes
+
+    The playback thread calls ``expect`` right before sending a step and
+    ``expire`` after it; the listener thread matches events as they come
+    in. Both sides take one lock for a few dict and deque operations.
+    ``expire`` returns True once more than ``drop_limit`` events have gone
+    missing since the run started or since it last returned True, which
+    the engine turns into a pause.
+    """
+
+    def __init__(self, timeout_ms=DEFAULT_TIMEOUT_MS, drop_limit=0):
+        self.timeout_ns = timeout_ms * 1_000_000
+        self.drop_limit = drop_limit
+        self.latency_ns = array('q', bytes(8 * LATENCY_CAPACITY))
+        self._lock = threading.Lock()
+        self._listener = None
+        self._sent_names = {}  # Backend key object -> canonical name
+        self._seen_names = {}  # pynput key -> canonical name
+        self.reset()
+
+    def reset(self):
+        """Forget everything sent and seen; called at the start of each run"""
+        with self._lock:
+            self._expected = {}  # (name, is_press) -> deque of (seq, sent_ns)
+            self._pending = deque()  # (seq, sent_ns, expected deque) in send order
+            self._seq = 0
+            self._last_seen_seq = -1
+            self._usual_latency_ns = None
+            self._pause_at = self.drop_limit
+            self.sent = 0
+            self.seen = 0
+            self.missing = 0
+            self.reordered = 0
+            self.unexpected = 0
+            self.latency_count = 0
+
+    @property
+    def is_running(self):
+        return self._listener is not None
+
+    def start(self):
+        if self._listener is not None:
+            return
+        from pynput.keyboard import Listener
+        self._listener = Listener(on_press=self._on_press, on_release=self._on_release)
+        self._listener.start()
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def expect(self, ops, sent_ns):
+        """Register a step's (key, is_press) events before they are sent"""
+        names = self._sent_names
+        with self._lock:
+            expected, pending = self._expected, self._pending
+            for key, is_press in ops:
+                name = names.get(key)
+                if name is None:
+                    name = names[key] = sent_key_name(key)
+                slot = expected.get((name, is_press))
+                if slot is None:
+                    slot = expected[(name, is_press)] = deque()
+                seq = self._seq
+                self._seq = seq + 1
+                slot.append((seq, sent_ns))
+                pending.append((seq, sent_ns, slot))
+            self.sent += len(ops)
+
+    def expire(self, now_ns):
+        """Count events older than the timeout that were never seen as missing
+
+        Returns True when the drop limit has just been exceeded.
+        """
+        cutoff_ns = now_ns - self.timeout_ns
+        pending = self._pending
+        with self._lock:
+            while pending and pending[0][1] < cutoff_ns:
+                seq, _, slot = pending.popleft()
+                # A seen event has already been taken off the front of its slot
+                if slot and slot[0][0] == seq:
+                    slot.popleft()
+                    self.missing += 1
+            if self.missing > self._pause_at:
+                self._pause_at = self.missing + self.drop_limit
+                return True
+        return False
+
+    def _seen_name(self, key):
+        name = self._seen_names.get(key)
+        if name is None:
+            name = pynput_key_name(key)
+            if len(name) == 1 and ord(name) < 32:
+                # Some platforms report ctrl+letter as a control character
+                name = chr(ord(name) + 96)
+            name = self._seen_names[key] = canonical_key_name(name)
+        return name
+
+    def _observe(self, key, is_press):
+        seen_ns = time.perf_counter_ns()
+        name = self._seen_name(key)
+        with self._lock:
+            slot = self._expected.get((name, is_press))
+            if not slot:
+                self.unexpected += 1
+                return
+            usual_ns = self._usual_latency_ns
+            if usual_ns is not None:
+                likely_sent_ns = seen_ns - usual_ns
+                while (len(slot) > 1 and slot[1][1] <= seen_ns
+                       and abs(slot[1][1] - likely_sent_ns) < abs(slot[0][1] - likely_sent_ns)):
+                    slot.popleft()
+                    self.missing += 1
+            seq, sent_ns = slot.popleft()
+            self.seen += 1
+            if seq < self._last_seen_seq:
+                self.reordered += 1
+            else:
+                self._last_seen_seq = seq
+            latency_ns = seen_ns - sent_ns
+            self.latency_ns[self.latency_count & (LATENCY_CAPACITY - 1)] = latency_ns
+            self.latency_count += 1
+            if usual_ns is None:
+                self._usual_latency_ns = latency_ns
+            else:
+                self._usual_latency_ns = usual_ns + ((latency_ns - usual_ns) >> LATENCY_EWMA_SHIFT)
+
+    def _on_press(self, key):
+        self._observe(key, True)
+
+    def _on_release(self, key):
+        self._observe(key, False)
+
+    def report(self):
+        """Counts and end-to-end latency statistics of the current run"""
+        with self._lock:
+            count = min(self.latency_count, LATENCY_CAPACITY)
+            latency = sorted(self.latency_ns[:count])
+            report = {
+                'sent': self.sent,
+                'seen': self.seen,
+                'missing': self.missing,
+                'reordered': self.reordered,
+                'unexpected': self.unexpected,
+                'pending': self.sent - self.seen - self.missing,
+            }
+        if latency:
+            n = len(latency)
+            report.update({
+                'latency_mean_us': sum(latency) / n / 1000.0,
+                'latency_p50_us': latency[(n - 1) // 2] / 1000.0,
+                'latency_p99_us': latency[min(n - 1, int(n * 0.99))] / 1000.0,
+                'latency_max_us': latency[-1] / 1000.0,
+            })
+        return report
+
+
+def format_report(report):
+    """One-line summary for the status area"""
+    text = (f"{report['seen']}/{report['sent']} events delivered, {report['missing']} missing, "
+            f"{report['reordered']} reordered")
+    if report['pending']:
+        text += f", {report['pending']} not confirmed yet"
+    if 'latency_p50_us' in report:
+        text += (f" | latency p50 {report['latency_p50_us']:.0f} µs, p99 {report['latency_p99_us']:.0f} µs, "
+                 f"max {report['latency_max_us']:.0f} µs")
+    return text
+
+
+def _probe_trial(backend, verifier, ops, rate_hz, taps):
+    """Tap at ``rate_hz`` and report whether every event arrived in order"""
+    verifier.reset()
+    interval_ns = int(1e9 / rate_hz)
+    start_ns = time.perf_counter_ns()
+    for n in range(taps):
+        spin_until(start_ns + n * interval_ns)
+        verifier.expect(ops, time.perf_counter_ns())
+        backend.emit(ops)
+    # Anything not seen by now is missing
+    time.sleep(verifier.timeout_ns / 1e9)
+    verifier.expire(time.perf_counter_ns())
+    report = verifier.report()
+    return report['missing'] == 0 and report['reordered'] == 0, report
+
+
+def probe_max_rate(backend, verifier, key_name='shift', taps=PROBE_TAPS,
+                   start_hz=PROBE_START_HZ, max_hz=PROBE_MAX_HZ, cancelled=None):
+    """Highest tap rate (steps/s) delivered without drops, or 0 if even ``start_hz`` drops
+
+    Doubles the rate from ``start_hz`` until a trial loses or reorders an
+    event, then bisects between the last good and the first bad rate.
+    ``verifier`` must be listening. Taps go to whatever has focus, so the
+    default key is Shift, which applications ignore on its own. The
+    optional ``cancelled()`` is checked between trials. Returns
+    (rate_hz, trials) with one (rate_hz, ok, report) tuple per trial.
+    """
+    key = backend.resolve_key(key_name)
+    ops = ((key, True), (key, False))
+    trials = []
+
+    def trial(rate_hz):
+        ok, report = _probe_trial(backend, verifier, ops, rate_hz, taps)
+        trials.append((rate_hz, ok, report))
+        return ok
+
+    good, bad = 0, None
+    rate_hz = start_hz
+    while rate_hz <= max_hz:
+        if cancelled is not None and cancelled():
+            return good, trials
+        if not trial(rate_hz):
+            bad = rate_hz
+            break
+        good = rate_hz
+        rate_hz *= 2
+    if bad is None:
+        if good == max_hz or trial(max_hz):
+            return max_hz, trials
+        bad = max_hz
+    while good and bad - good > good * PROBE_PRECISION:
+        if cancelled is not None and cancelled():
+            break
+        rate_hz = (good + bad) // 2
+        if trial(rate_hz):
+            good = rate_hz
+        else:
+            bad = rate_hz
+    return good, trials
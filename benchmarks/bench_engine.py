@@ -0,0 +1,208 @@
+"""Headless timing benchmarks for the playback engine
+
+Runs the engine against the capture backend, which only timestamps
+events, so no real keys are injected. Qt runs offscreen; the GUI thread is simulated by
+a 1 ms QTimer whose worst stall is reported as the UI freeze.
+
+    python benchmarks/bench_engine.py                 # quick set
+    python benchmarks/bench_engine.py --full -o report.json
+    python benchmarks/bench_engine.py --baseline report.json   # exit 1 on regression
+
+The report is JSON so CI or a rig check can compare it against a baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autokey.backends import CaptureBackend, create_backend  # noqa: E402
+from autokey.engine import PlaybackEngine  # noqa: E402
+from autokey.plan import compile_plan  # noqa: E402
+
+try:
+    from PyQt6.QtCore import QCoreApplication, QTimer
+except ImportError:  # Qt is optional here; the UI stall metric is skipped
+    QCoreApplication = None
+
+
+QUICK_INTERVALS_MS = [1, 5, 20, 100]
+FULL_INTERVALS_MS = [1, 2, 5, 10, 20, 50, 100, 500, 1000, 5000]
+QUICK_LENGTHS = [1, 4]
+FULL_LENGTHS = [1, 4, 16, 64]
+
+
+def run_engine(plan, repeats, stop_after=None):
+    """Play ``plan`` on a fresh engine; return (keyboard, result, wall_ns, cpu_ns, ui_stall_ns)"""
+    keyboard = CaptureBackend()
+    done = threading.Event()
+    result = {}
+
+    def on_finished(count, elapsed, reason):
+        result.update(count=count, elapsed=elapsed, reason=reason, finished_ns=time.perf_counter_ns())
+        done.set()
+
+    engine = PlaybackEngine(keyboard, on_finished=on_finished)
+    ui_stall = [0]
+    app = QCoreApplication.instance() if QCoreApplication else None
+    cpu_start = time.process_time_ns()
+    wall_start = time.perf_counter_ns()
+    engine.start(plan, repeats)
+    if stop_after is not None:
+        def stop():
+            result['stop_ns'] = time.perf_counter_ns()
+            engine.stop()
+        threading.Timer(stop_after, stop).start()
+
+    if app is not None:
+        # Measure how long the GUI thread goes without servicing a 1 ms timer
+        last = [time.perf_counter_ns()]
+
+        def tick():
+            now = time.perf_counter_ns()
+            ui_stall[0] = max(ui_stall[0], now - last[0])
+            last[0] = now
+            if done.is_set():
+                app.quit()
+
+        timer = QTimer()
+        timer.timeout.connect(tick)
+        timer.start(1)
+        app.exec()
+        timer.stop()
+    done.wait()
+    wall_ns = time.perf_counter_ns() - wall_start
+    cpu_ns = time.process_time_ns() - cpu_start
+    engine.shutdown()
+    return keyboard, result, wall_ns, cpu_ns, ui_stall[0] if app is not None else None
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def bench_accuracy(interval_ms, length, duration_s):
+    """Scheduling error of every press against its ideal time"""
+    keys = '+'.join(f'k{i}' for i in range(length))
+    plan = compile_plan(keys, [interval_ms] * length, lambda name: name)
+    repeats = max(2, int(duration_s * 1000 / (interval_ms * length)))
+    keyboard, result, wall_ns, cpu_ns, ui_stall_ns = run_engine(plan, repeats)
+    press_ns = keyboard.press_times()
+    t0 = press_ns[0]
+    step_ns = interval_ms * 1_000_000
+    errors = sorted(t - t0 - i * step_ns for i, t in enumerate(press_ns))
+    nominal_ns = (len(press_ns) - 1) * step_ns
+    return {
+        'interval_ms': interval_ms,
+        'sequence_length': length,
+        'presses': len(press_ns),
+        'mean_error_us': sum(errors) / len(errors) / 1000.0,
+        'p50_error_us': percentile(errors, 0.5) / 1000.0,
+        'p99_error_us': percentile(errors, 0.99) / 1000.0,
+        'max_error_us': errors[-1] / 1000.0,
+        'end_drift_us': (press_ns[-1] - t0 - nominal_ns) / 1000.0,
+        'cpu_percent': 100.0 * cpu_ns / wall_ns,
+        'ui_max_stall_ms': ui_stall_ns / 1e6 if ui_stall_ns is not None else None,
+    }
+
+
+def bench_max_rate(presses):
+    """Highest sustainable press rate: a zero-delay plan sent back to back"""
+    plan = compile_plan('k', [0], lambda name: name)
+    keyboard, result, wall_ns, cpu_ns, _ = run_engine(plan, presses)
+    press_ns = keyboard.press_times()
+    span_ns = press_ns[-1] - press_ns[0]
+    return {
+        'presses': len(press_ns),
+        'presses_per_second': (len(press_ns) - 1) * 1e9 / span_ns if span_ns else None,
+        'cpu_percent': 100.0 * cpu_ns / wall_ns,
+    }
+
+
+def bench_stop_latency(interval_ms, trials):
+    """Time from stop() to the engine reporting it finished"""
+    plan = compile_plan('k', [interval_ms], lambda name: name)
+    latencies = []
+    for trial in range(trials):
+        # Stop at different points inside an interval
+        stop_after = 0.05 + (trial / trials) * interval_ms / 1000.0
+        keyboard, result, _, _, _ = run_engine(plan, 0, stop_after=stop_after)
+        latencies.append(result['finished_ns'] - result['stop_ns'])
+    latencies.sort()
+    return {
+        'interval_ms': interval_ms,
+        'trials': trials,
+        'p50_ms': percentile(latencies, 0.5) / 1e6,
+        'max_ms': latencies[-1] / 1e6,
+    }
+
+
+def find_regressions(report, baseline, tolerance):
+    """Accuracy cases whose p99 error grew past ``tolerance`` x baseline (+0.5 ms slack)"""
+    previous = {(case['interval_ms'], case['sequence_length']): case for case in baseline.get('accuracy', [])}
+    regressions = []
+    for case in report['accuracy']:
+        before = previous.get((case['interval_ms'], case['sequence_length']))
+        if before and case['p99_error_us'] > before['p99_error_us'] * tolerance + 500:
+            regressions.append({'interval_ms': case['interval_ms'],
+                                'sequence_length': case['sequence_length'],
+                                'baseline_p99_us': before['p99_error_us'],
+                                'p99_us': case['p99_error_us']})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--full', action='store_true', help='sweep 1 ms to 5 s and longer sequences')
+    parser.add_argument('--duration', type=float, default=None, help='seconds per accuracy case')
+    parser.add_argument('-o', '--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--backend-cost', action='append', default=[], metavar='NAME',
+                        help='also measure the per-event cost of a real backend (injects shift taps)')
+    parser.add_argument('--baseline', help='earlier report to compare p99 scheduling error against')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed p99 growth factor (default 1.5)')
+    args = parser.parse_args(argv)
+
+    if QCoreApplication is not None and QCoreApplication.instance() is None:
+        app = QCoreApplication(sys.argv[:1])  # noqa: F841 (kept alive for the run)
+
+    intervals = FULL_INTERVALS_MS if args.full else QUICK_INTERVALS_MS
+    lengths = FULL_LENGTHS if args.full else QUICK_LENGTHS
+    duration = args.duration or (10.0 if args.full else 1.0)
+
+    accuracy = []
+    for interval_ms in intervals:
+        for length in lengths:
+            # Long intervals need a few cycles, not a fixed duration
+            case_duration = max(duration, 3 * interval_ms * length / 1000.0)
+            accuracy.append(bench_accuracy(interval_ms, length, case_duration))
+            print(f"accuracy {interval_ms} ms x {length}: p99 {accuracy[-1]['p99_error_us']:.0f} µs", file=sys.stderr)
+
+    report = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'qt': QCoreApplication is not None,
+        'accuracy': accuracy,
+        'max_rate': bench_max_rate(20000 if args.full else 5000),
+        'stop_latency': [bench_stop_latency(interval_ms, 10 if args.full else 3)
+                         for interval_ms in ([20, 1000, 5000] if args.full else [20, 500])],
+    }
+    report['backend_cost'] = [create_backend(name).measure_event_cost() for name in args.backend_cost]
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = find_regressions(report, json.load(f), args.tolerance)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,70 +1,165 @@
 import sys
 import time
+
+_STARTUP_NS = time.perf_counter_ns()  # Origin of the --profile-startup timings
+
 import threading
 import os
+import sqlite3
+import logging
+import difflib
+from itertools import islice
+from array import array
+
+if __name__ == '__main__' and sys.argv[1:2] == ['run']:
+    # Headless runs never load Qt
+    from autokey.cli import main as cli_main
+    sys.exit(cli_main(sys.argv[1:]))
+
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, 
                              QWidget, QPushButton, QLineEdit, QLabel, 
                              QSpinBox, QDoubleSpinBox, QComboBox, QGroupBox, QRadioButton, 
-                             QButtonGroup, QCheckBox, QTableWidget, QTableWidgetItem,
-                             QHeaderView, QSplitter)
-from PyQt6.QtCore import QTimer, pyqtSignal, QObject, Qt
+                             QButtonGroup, QCheckBox, QTableView,
+                             QHeaderView, QSplitter, QFileDialog, QListWidget, QListWidgetItem,
+                             QInputDialog)
+from PyQt6.QtCore import QTimer, pyqtSignal, QObject, Qt, QAbstractTableModel, QModelIndex
 from PyQt6.QtGui import QFont, QPixmap, QIcon
-import pynput
-from pynput.keyboard import Key, Listener
-import os
+from autokey.backends import BACKENDS, available_backends, create_backend
+from autokey.calibration import OverheadModel, calibrate, load_calibration, save_calibration
+from autokey.engine import PlaybackEngine
+from autokey.hotkeys import HotkeyListener, KillSwitch, parse_trigger, pynput_key_name
+from autokey.log import configure as configure_logging
+from autokey.library import SavedSequence, SequenceLibrary, parse_tags
+from autokey.macro import EXTENSION as MACRO_EXTENSION, Macro, MacroPlan, save_macro
+from autokey.multi import MultiPlaybackEngine, Track
+from autokey.plan import DEFAULT_INTERVAL_MS, PlanCache, compile_plan, combination_cycle_ns, combination_steps, compile_recording, parse_keys, parse_rows
+from autokey.profiles import CONSTANT as CONSTANT_PROFILE, PROFILES as MOTION_PROFILES
+from autokey.recorder import STOP, EventLog, EventRing
+from autokey.startup import PROFILE_FLAG, StartupProfiler, profiling_requested, resource_path
+from autokey.telemetry import PRESS, RELEASE, TimingRecorder, format_stats
+from autokey.tracing import STATS_UPDATE, UI_UPDATE, TraceBuffer, write_chrome_trace
+from autokey.verify import DEFAULT_TIMEOUT_MS as VERIFY_TIMEOUT_MS, DeliveryVerifier, format_report, probe_max_rate
+
+
+LOGO_PATH = "asset/img/logo.png"
+MAX_REPEATS = 2147483647  # Largest QSpinBox value; the engine itself has no limit
+RECORDING_DRAIN_MS = 30  # How often recorded events are moved to the GUI thread
+PROGRESS_REFRESH_MS = 50  # The run status is sampled at 20 Hz, not redrawn per repeat
+TABLE_DEBOUNCE_MS = 150  # Typing pause before the timing table follows the combination
+TABLE_DIFF_MAX_ROWS = 500  # Larger changed spans reset the table instead of being diffed row by row
+COMBINATION_MAX_LENGTH = 1 << 22  # QLineEdit's default of 32767 cuts off long recordings
+TEST_DESCRIPTION_STEPS = 20  # Steps named in the test result before it is cut short
+PROBE_SAFETY = 0.8  # Burst rate limit as a share of the highest drop-free rate found by the probe
+
+logger = logging.getLogger('autokey.gui')
 
 
 class KeyboardController(QObject):
     """Handles keyboard automation functionality"""
     
     combination_recorded = pyqtSignal(str)  # Signal to emit when combination is recorded
+    playback_finished = pyqtSignal(int, float, str)  # Completed repeats, elapsed seconds, reason
+    trigger_fired = pyqtSignal(int)  # Library id of the sequence whose global trigger was pressed
+    rate_probed = pyqtSignal(int, str)  # Highest drop-free rate in steps/s (0 if none), error message
     
     def __init__(self):
         super().__init__()
-        self.keyboard_controller = pynput.keyboard.Controller()
+        self.backend_name = 'pynput'
+        self._backend = None  # Created on first use so pynput is not imported at startup
         self.is_running = False
         self.is_recording = False
-        self.recorded_keys = list()
+        self.event_ring = EventRing()  # Listener thread -> GUI thread hand-off
+        self.event_log = EventLog()  # Timestamped presses/releases of the last recording
+        self.ring_key_names = {}  # pynput key -> name, while recording
         self.listener = None
-        self.stop_key = Key.esc  # Default stop key is ESC
-        
+        self.stop_key_name = 'esc'  # Default stop key is ESC
+        self.hotkeys = None  # HotkeyListener, created when triggers are first enabled
+        self.kill_switch = KillSwitch(self.abort_playback)  # Started with the first run
+        
+        # Key injection runs on its own thread so the GUI never blocks on it;
+        # progress is sampled from the engines on a timer (see refresh_progress)
+        self.engine = PlaybackEngine(None, on_finished=self.playback_finished.emit)
+        self.multi_engine = MultiPlaybackEngine(None, on_finished=self.playback_finished.emit)
+        self.active_engine = self.engine  # The engine Stop/Pause/Resume go to
+        self.telemetry = None  # Allocated the first time timing recording is enabled
+        self.playback_trace = None  # TraceBuffers of the playback and GUI threads, while tracing
+        self.overhead = None  # OverheadModel while injection overhead is compensated
+        self.verifier = None  # DeliveryVerifier while delivery is verified
+        self.probe_thread = None  # Rate probe running in the background
+        self.probe_cancelled = threading.Event()
+        self.gui_trace = None
+        
+        # Coalesced drain of recorded events into the GUI thread
+        self.drain_timer = QTimer(self)
+        self.drain_timer.timeout.connect(self.drain_recording)
+        
+    @property
+    def backend(self):
+        """The output backend, created the first time it is needed"""
+        if self._backend is None:
+            self._backend = create_backend(self.backend_name)
+        return self._backend
+    
     def set_stop_key(self, key_name):
         """Set the key that stops recording"""
-        if hasattr(Key, key_name.lower()):
-            self.stop_key = getattr(Key, key_name.lower())
-        else:
-            self.stop_key = key_name
+        self.stop_key_name = key_name.lower()
             
     def start_recording(self):
-        """Start recording key combination"""
+        """Start recording key presses and releases with their timestamps
+
+        The listener callbacks run on pynput's thread and only push compact
+        records into an SPSC ring; the GUI thread drains it in batches on
+        a timer, so nothing on the OS input path waits for the GUI.
+        """
+        if self.listener is not None:
+            return
+        from pynput.keyboard import Key, Listener
+        
         self.is_recording = True
-        self.recorded_keys.clear()
+        self.event_ring.reset()
+        self.event_log.clear(time.perf_counter_ns())
+        ring = self.event_ring
+        stop_key = getattr(Key, self.stop_key_name, self.stop_key_name)
         
         def on_press(key):
-            if not self.is_recording:
+            if key == stop_key:
+                ring.push(None, STOP, time.perf_counter_ns())
                 return False
-            
-
-            # Check if stop key is pressed
-            if key == self.stop_key:
-                self.stop_recording()
-                return False
-                
-            # Add key to recorded set
-            try:
-                if hasattr(key, 'char') and key.char:
-                    self.recorded_keys.append(key.char)
-                else:
-                    self.recorded_keys.append(key.name)
-            except AttributeError:
-                self.recorded_keys.append(str(key).replace('Key.', ''))
+            ring.push(key, PRESS, time.perf_counter_ns())
         
         def on_release(key):
-            if not self.is_recording:
-                return False
+            if key != stop_key:
+                ring.push(key, RELEASE, time.perf_counter_ns())
                 
         self.listener = Listener(on_press=on_press, on_release=on_release)
         self.listener.start()
+        self.drain_timer.start(RECORDING_DRAIN_MS)
+    
+    def drain_recording(self):
+        """Timer slot: move queued listener events into the event log"""
+        if self.drain_events():
+            self.stop_recording()
+    
+    def drain_events(self):
+        """Append one batch from the ring to the event log; True if the stop key was seen"""
+        key_names = self.ring_key_names
+        stopped = False
+        for key, action, timestamp_ns in self.event_ring.drain():
+            if stopped:
+                continue
+            if action == STOP:
+                self.event_log.finish(timestamp_ns)
+                stopped = True
+                continue
+            name = key_names.get(key)
+            if name is None:
+                name = key_names[key] = self.key_name(key)
+            self.event_log.append(name, action, timestamp_ns)
+        return stopped
+    
+    def key_name(self, key):
+        """Name of a pynput key as used in combinations"""
+        return pynput_key_name(key)
     
     def stop_recording(self):
         """Stop recording and emit the combination"""
@@ -72,58 +167,358 @@ class KeyboardController(QObject):
             return
             
         self.is_recording = False
+        self.drain_timer.stop()
         if self.listener:
             self.listener.stop()
             self.listener = None
+        # Pick up anything queued after the last timer tick
+        self.drain_events()
+        self.ring_key_names.clear()
+        if self.event_log.end_ns <= self.event_log.start_ns:
+            self.event_log.finish(time.perf_counter_ns())
+        if self.event_ring.overflows:
+            logger.warning("Recording dropped %d events (queue full)", self.event_ring.overflows)
             
         # Convert recorded keys to string
-        if self.recorded_keys:
-            combination = '+'.join(self.recorded_keys)
+        combination = self.event_log.combination()
+        if combination:
             self.combination_recorded.emit(combination)
         
-    def send_key_combination(self, keys, timing_intervals=None, include_final_delay=True):
-        """Send keys sequentially with timing delays from the table"""
+    def resolve_key(self, key_name):
+        """Convert a key name into a key object for the current backend"""
+        return self.backend.resolve_key(key_name)
+
+    def set_backend(self, name):
+        """Switch the output backend; only call while nothing is playing"""
+        if name == self.backend_name:
+            return
+        backend = create_backend(name)
+        if self._backend is not None:
+            self._backend.close()
+        self._backend = backend
+        self.backend_name = name
+        if self.overhead is not None:
+            self.set_compensation_enabled(True)
+
+    def measure_backend_cost(self):
+        """Measure the current backend's per-event injection cost and save it for this machine"""
+        cost = calibrate(self.backend)
+        if self.overhead is not None:
+            self.set_compensation_enabled(True)
+        return cost
+
+    def set_compensation_enabled(self, enabled):
+        """Start steps early by the backend's injection cost in the following runs
+
+        Uses this machine's saved calibration, measuring one first if there
+        is none yet. Returns the cost dict in use, or None when disabled.
+        """
+        if enabled:
+            cost = load_calibration(self.backend_name) or calibrate(self.backend)
+            self.overhead = OverheadModel(cost)
+        else:
+            self.overhead = None
+        self.engine.overhead = self.multi_engine.overhead = self.overhead
+        return self.overhead.calibration if enabled else None
+
+    def set_verification_enabled(self, enabled, drop_limit=0):
+        """Check every injected event against a loopback listener in the following runs"""
+        if enabled:
+            if self.verifier is None:
+                self.verifier = DeliveryVerifier(drop_limit=drop_limit)
+            self.verifier.drop_limit = drop_limit
+            self.verifier.start()
+        elif self.verifier is not None:
+            self.verifier.stop()
+            self.verifier = None
+        self.engine.verifier = self.multi_engine.verifier = self.verifier
+
+    def set_drop_limit(self, drop_limit):
+        """Missing events tolerated before a verified run pauses itself"""
+        if self.verifier is not None:
+            self.verifier.drop_limit = drop_limit
+
+    def probe_rate(self):
+        """Find the highest drop-free tap rate in the background; reports through rate_probed"""
+        if self.probe_thread is not None and self.probe_thread.is_alive():
+            return
+        backend = self.backend
+        self.probe_cancelled.clear()
+        
+        def probe():
+            verifier = self.verifier
+            own_verifier = verifier is None
+            try:
+                if own_verifier:
+                    verifier = DeliveryVerifier()
+                    verifier.start()
+                rate_hz, _ = probe_max_rate(backend, verifier, cancelled=self.probe_cancelled.is_set)
+            except Exception as e:
+                logger.error("Rate probe failed: %s", e)
+                self.rate_probed.emit(0, str(e))
+                return
+            finally:
+                if own_verifier and verifier is not None:
+                    verifier.stop()
+            self.rate_probed.emit(rate_hz, "")
+        
+        self.probe_thread = threading.Thread(target=probe, name='AutoKeyRateProbe', daemon=True)
+        self.probe_thread.start()
+    
+    @property
+    def is_probing(self):
+        return self.probe_thread is not None and self.probe_thread.is_alive()
+
+    def save_recalibration(self):
+        """Save the cost the last run re-calibrated to, if it did; returns it or None"""
+        overhead = self.overhead
+        if overhead is None or not overhead.recalibrations:
+            return None
+        return save_calibration(overhead.cost())
+
+    def start_playback(self, plan, repeats=0, cycle_lengths_ns=None, rate_limit=None):
+        """Start sending a compiled plan on the playback thread"""
+        self.kill_switch.start()
+        if self.gui_trace is not None:
+            self.gui_trace.reset()
+        self.engine.keyboard = self.backend
+        self.active_engine = self.engine
+        self.engine.start(plan, repeats, cycle_lengths_ns, rate_limit)
+    
+    def start_multi_playback(self, tracks):
+        """Start several Tracks together on one playback thread"""
+        self.kill_switch.start()
+        if self.gui_trace is not None:
+            self.gui_trace.reset()
+        self.multi_engine.keyboard = self.backend
+        self.active_engine = self.multi_engine
+        self.multi_engine.start(tracks)
+
+    def set_triggers(self, triggers):
+        """Listen for (trigger_text, sequence_id) hotkeys; returns the unparsable ones"""
+        if self.hotkeys is None:
+            self.hotkeys = HotkeyListener(self.trigger_fired.emit)
+        invalid = self.hotkeys.set_triggers(triggers)
+        self.hotkeys.start()
+        return invalid
+    
+    def disable_triggers(self):
+        """Stop listening for global triggers"""
+        if self.hotkeys is not None:
+            self.hotkeys.stop()
+    
+    def set_telemetry_enabled(self, enabled):
+        """Record per-keystroke timing for the following runs"""
+        if enabled and self.telemetry is None:
+            self.telemetry = TimingRecorder()
+        self.engine.telemetry = self.telemetry if enabled else None
+
+    def set_tracing_enabled(self, enabled):
+        """Record cycle, wait, inject and UI update spans for the following runs"""
+        if enabled and self.playback_trace is None:
+            self.playback_trace = TraceBuffer('playback')
+            self.gui_trace = TraceBuffer('gui')
+        elif not enabled:
+            self.playback_trace = self.gui_trace = None
+        self.engine.trace = self.multi_engine.trace = self.playback_trace
+
+    def export_trace(self, path):
+        """Write the last run's spans as Chrome trace-event JSON; returns the span count"""
+        return write_chrome_trace(path, [self.playback_trace, self.gui_trace])
+
+    def set_kill_key(self, key_name):
+        """Set the global emergency stop key"""
+        self.kill_switch.key_name = key_name.lower()
+
+    def abort_playback(self, pressed_ns=None):
+        """Emergency stop; called on the kill switch's listener thread"""
+        self.engine.abort(pressed_ns)
+        self.multi_engine.abort(pressed_ns)
+
+    def stop_playback(self):
+        """Stop the running sequence"""
+        self.active_engine.stop()
+
+    def pause_playback(self):
+        """Pause the running sequence"""
+        self.active_engine.pause()
+
+    def resume_playback(self):
+        """Resume a paused sequence"""
+        self.active_engine.resume()
+
+    def shutdown(self):
+        """Stop playback and recording before the app exits"""
+        self.stop_recording()
+        self.disable_triggers()
+        self.kill_switch.stop()
+        self.probe_cancelled.set()
+        if self.verifier is not None:
+            self.verifier.stop()
+        self.engine.shutdown()
+        self.multi_engine.shutdown()
+        if self._backend is not None:
+            self._backend.close()
+
+
+class TimingTableModel(QAbstractTableModel):
+    """Transitions of the key sequence and the delay after each one
+
+    Row ``i`` goes from step ``i`` to step ``i + 1`` (the last row wraps
+    around to the first step), so the model only stores the Steps as
+    written (see plan.parse_rows) and an ``array`` of delays; the view
+    asks for the rows it shows. A step with its own ``@`` delay shows that
+    delay and cannot be edited here.
+    """
+    
+    HEADERS = ("From Key", "To Key", "Delay (ms)")
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self.delays = array('i')
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 3
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+    
+    def flags(self, index):
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() == 2 and self.rows[index.row()].delay_ms is None:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return None
+        row, column = index.row(), index.column()
+        if column == 0:
+            return self.rows[row].label
+        if column == 1:
+            return self.rows[(row + 1) % len(self.rows)].label
+        fixed_ms = self.rows[row].delay_ms
+        if fixed_ms is not None:
+            return f"{fixed_ms} (@)"
+        return self.delays[row] if role == Qt.ItemDataRole.EditRole else str(self.delays[row])
+    
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or index.column() != 2:
+            return False
         try:
-            import time  # Make sure time is available
-            key_objects = []
-            for key_name in keys:
-                if hasattr(Key, key_name.lower()):
-                    key_objects.append(getattr(Key, key_name.lower()))
-                else:
-                    key_objects.append(key_name)
-            
-            # Always send keys sequentially with timing
-            for i, key in enumerate(key_objects):
-                self.keyboard_controller.press(key)
-                self.keyboard_controller.release(key)
-                
-                # Apply delay after each key
-                if timing_intervals and i < len(timing_intervals):
-                    # For automation (include_final_delay=False), skip the last delay
-                    # as it will be handled by the timer cycle
-                    if not include_final_delay and i == len(timing_intervals) - 1:
-                        continue
-                    delay = timing_intervals[i] / 1000.0  # Convert ms to seconds
-                    time.sleep(delay)
-                elif include_final_delay:
-                    # Default delay if no timing specified (only for test mode)
-                    time.sleep(0.1)  # 100ms default
-            
-            return True
-        except Exception as e:
-            print(f"Error sending key combination: {e}")
+            delay = int(value)
+        except (TypeError, ValueError):
             return False
+        if delay < 0:
+            return False
+        self.delays[index.row()] = delay
+        self.dataChanged.emit(index, index)
+        return True
+    
+    def set_rows(self, rows, default_delay=DEFAULT_INTERVAL_MS):
+        """Follow a new list of Steps, keeping the delays of unchanged steps
+        
+        Only the rows that differ are inserted or removed: the common prefix
+        and suffix are skipped and the middle is diffed with difflib, so
+        an edit in a long sequence costs little more than the edit itself.
+        The diff is quadratic, so a middle longer than TABLE_DIFF_MAX_ROWS
+        (pasting or loading a different sequence) resets the model instead
+        and its rows keep the old delays by position.
+        """
+        old = self.rows
+        start = 0
+        end_old, end_new = len(old), len(rows)
+        while start < min(end_old, end_new) and old[start] == rows[start]:
+            start += 1
+        while end_old > start and end_new > start and old[end_old - 1] == rows[end_new - 1]:
+            end_old -= 1
+            end_new -= 1
+        if start == end_old == end_new:
+            return
+        if max(end_old, end_new) - start > TABLE_DIFF_MAX_ROWS:
+            self._reset_middle(rows, start, end_old, end_new, default_delay)
+            return
+        
+        matcher = difflib.SequenceMatcher(None, old[start:end_old], rows[start:end_new], autojunk=False)
+        # Apply from the end so earlier row numbers stay valid
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            i1, i2, j1, j2 = i1 + start, i2 + start, j1 + start, j2 + start
+            if tag == 'equal':
+                continue
+            if tag == 'replace':
+                # Renamed steps keep their delays; any surplus is inserted or removed below
+                common = min(i2 - i1, j2 - j1)
+                self.rows[i1:i1 + common] = rows[j1:j1 + common]
+                i1 += common
+                j1 += common
+            if i2 > i1:
+                self.beginRemoveRows(QModelIndex(), i1, i2 - 1)
+                del self.rows[i1:i2]
+                del self.delays[i1:i2]
+                self.endRemoveRows()
+            if j2 > j1:
+                self.beginInsertRows(QModelIndex(), i1, i1 + j2 - j1 - 1)
+                self.rows[i1:i1] = rows[j1:j2]
+                self.delays[i1:i1] = array('i', [default_delay] * (j2 - j1))
+                self.endInsertRows()
+        # Renamed steps and the "To Key" of their neighbours
+        if self.rows:
+            first = max(start - 1, 0)
+            self.dataChanged.emit(self.index(first, 0), self.index(len(self.rows) - 1, 2))
+    
+    def _reset_middle(self, rows, start, end_old, end_new, default_delay):
+        """Replace rows ``start:end_old`` by ``rows[start:end_new]`` with one model reset"""
+        middle = self.delays[start:end_old]
+        if len(middle) < end_new - start:
+            middle.extend([default_delay] * (end_new - start - len(middle)))
+        self.beginResetModel()
+        self.rows[start:end_old] = rows[start:end_new]
+        self.delays[start:end_old] = middle[:end_new - start]
+        self.endResetModel()
+    
+    def set_delays(self, delays):
+        """Overwrite the delays row by row; extra values are ignored"""
+        count = min(len(delays), len(self.rows))
+        if not count:
+            return
+        self.delays[:count] = array('i', delays[:count])
+        self.dataChanged.emit(self.index(0, 2), self.index(count - 1, 2))
+    
+    def fill(self, delay):
+        """Give every row the same delay"""
+        self.set_delays([delay] * len(self.rows))
 
 
 class AutoKeyApp(QMainWindow):
-    def __init__(self):
+    def __init__(self, profiler=None):
         super().__init__()
+        self.profiler = profiler or StartupProfiler(enabled=False)
+        self.first_paint_done = False
+        self.logo_pixmap = None
         self.keyboard_controller = KeyboardController()
         self.keyboard_controller.combination_recorded.connect(self.on_combination_recorded)
+        self.keyboard_controller.playback_finished.connect(self.on_playback_finished)
+        self.keyboard_controller.trigger_fired.connect(self.on_trigger_fired)
+        self.keyboard_controller.rate_probed.connect(self.on_rate_probed)
         self.is_running = False
+        self.is_testing = False
         self.is_recording = False
+        self.plan_cache = PlanCache(self.keyboard_controller.resolve_key)
+        self.recording_plan = None
+        self.macro = None  # Macro file opened for replay instead of the last recording
+        self.checked_sequence_ids = set()  # Library sequences to run together
+        self.pending_tracks = None  # Tracks waiting for the start countdown
+        self.multi_tracks = None  # Tracks of the running combined run
+        self.library = None  # SequenceLibrary, opened once the window is up
         self.init_ui()
         self.setup_timers()
+        QTimer.singleShot(0, self.open_library)
         
     def init_ui(self):
         self.setWindowTitle("ASSP - Auto Stereotaxic Surgery Program")
@@ -131,6 +526,7 @@ class AutoKeyApp(QMainWindow):
         
         # Set window icon if available
         self.setup_images()
+        self.profiler.mark("images")
         
         # Create central widget and main layout
         central_widget = QWidget()
@@ -228,6 +624,7 @@ class AutoKeyApp(QMainWindow):
                 color: black;
             }
         """)
+        self.profiler.mark("stylesheet")
         
         # Create splitter for better layout
         splitter = QSplitter(Qt.Orientation.Horizontal)
@@ -268,22 +665,25 @@ class AutoKeyApp(QMainWindow):
         # Right panel - Timing Table
         right_panel = QWidget()
         right_layout = QVBoxLayout(right_panel)
+        self.create_library_group(right_layout)
         self.create_timing_table_group(right_layout)
+        self.create_telemetry_group(right_layout)
         
         splitter.addWidget(left_panel)
         splitter.addWidget(right_panel)
         splitter.setSizes([400, 500])
+        self.profiler.mark("init_ui")
         
     def setup_images(self):
         """Setup images and icons for the application"""
         try:
             # Set window icon from asset/img/logo.png
-            logo_path = "asset/img/logo.png"
-            if os.path.exists(logo_path):
-                self.setWindowIcon(QIcon(logo_path))
-                print(f"Window icon loaded from: {logo_path}")
+            logo_pixmap = self.get_logo_pixmap()
+            if logo_pixmap is not None:
+                self.setWindowIcon(QIcon(logo_pixmap))
+                logger.debug("Window icon loaded from: %s", LOGO_PATH)
             else:
-                print(f"Logo file not found at: {logo_path}")
+                logger.warning("Logo file not found at: %s", LOGO_PATH)
             
             # Store image paths for later use
             self.images = {
@@ -295,7 +695,7 @@ class AutoKeyApp(QMainWindow):
             }
             
         except Exception as e:
-            print(f"Could not load images: {e}")
+            logger.warning("Could not load images: %s", e)
             # Fallback to text-only interface
             self.images = {
                 'record_icon': 'Record',
@@ -305,6 +705,14 @@ class AutoKeyApp(QMainWindow):
                 'keyboard_icon': 'AutoKey'
             }
     
+    def get_logo_pixmap(self):
+        """Logo pixmap, read from disk once and shared by the icon and footer"""
+        if self.logo_pixmap is None:
+            logo_path = resource_path(LOGO_PATH)
+            if os.path.exists(logo_path):
+                self.logo_pixmap = QPixmap(logo_path)
+        return self.logo_pixmap
+    
     def create_key_selection_group(self, parent_layout):
         """Create key combination selection controls"""
         key_group = QGroupBox("Key Combination")
@@ -341,8 +749,10 @@ class AutoKeyApp(QMainWindow):
         custom_layout = QHBoxLayout()
         custom_layout.addWidget(QLabel("Custom combination:"))
         self.combo_input = QLineEdit()
-        self.combo_input.setPlaceholderText("Enter keys separated by '+' (e.g., 'ctrl+shift+s')")
-        self.combo_input.textChanged.connect(self.update_timing_table)  # Update table when text changes
+        self.combo_input.setPlaceholderText("Steps by ',', chords like 'ctrl+shift+s', repeats like '(tab+down)*20', delays like 'enter@250ms'")
+        self.combo_input.setMaxLength(COMBINATION_MAX_LENGTH)
+        self.combo_input.textChanged.connect(self.plan_cache.invalidate)
+        self.combo_input.textChanged.connect(self.schedule_timing_table_update)  # Update table once typing pauses
         custom_layout.addWidget(self.combo_input)
         layout.addLayout(custom_layout)
         
@@ -371,6 +781,29 @@ class AutoKeyApp(QMainWindow):
         record_button_layout.addWidget(self.recording_status)
         record_layout.addLayout(record_button_layout)
         
+        # What to do with the recorded timing
+        self.use_recorded_timing_check = QCheckBox("Fill delays from recorded timing")
+        self.use_recorded_timing_check.setChecked(True)
+        record_layout.addWidget(self.use_recorded_timing_check)
+        
+        self.replay_recording_check = QCheckBox("Replay recording with original timing (press and release)")
+        self.replay_recording_check.setEnabled(False)
+        self.replay_recording_check.toggled.connect(self.on_replay_recording_toggled)
+        record_layout.addWidget(self.replay_recording_check)
+        
+        # Binary macro files
+        macro_layout = QHBoxLayout()
+        save_macro_btn = QPushButton("💾 Save Macro")
+        save_macro_btn.setStyleSheet("QPushButton { background-color: #2E86AB; color: white; font-weight: bold; padding: 5px; border-radius: 3px; }")
+        save_macro_btn.clicked.connect(self.save_macro_file)
+        macro_layout.addWidget(save_macro_btn)
+        open_macro_btn = QPushButton("📂 Open Macro")
+        open_macro_btn.setStyleSheet("QPushButton { background-color: #2E86AB; color: white; font-weight: bold; padding: 5px; border-radius: 3px; }")
+        open_macro_btn.clicked.connect(self.open_macro_file)
+        macro_layout.addWidget(open_macro_btn)
+        macro_layout.addStretch()
+        record_layout.addLayout(macro_layout)
+        
         layout.addLayout(record_layout)
         
         # Test button
@@ -405,7 +838,7 @@ class AutoKeyApp(QMainWindow):
         repeat_layout = QHBoxLayout()
         repeat_layout.addWidget(QLabel("Number of repeats:"))
         self.repeat_count_spin = QSpinBox()
-        self.repeat_count_spin.setRange(1, 10000)
+        self.repeat_count_spin.setRange(1, MAX_REPEATS)
         self.repeat_count_spin.setValue(10)
         self.repeat_count_spin.setSuffix(" times")
         self.repeat_count_spin.setEnabled(False)
@@ -415,6 +848,82 @@ class AutoKeyApp(QMainWindow):
         
         # Enable/disable repeat count based on mode
         self.timed_radio.toggled.connect(self.repeat_count_spin.setEnabled)
+        self.repeat_count_spin.valueChanged.connect(self.update_move_time_preview)
+        
+        # Output backend
+        backend_layout = QHBoxLayout()
+        backend_layout.addWidget(QLabel("Output backend:"))
+        self.backend_combo = QComboBox()
+        for name in available_backends():
+            self.backend_combo.addItem(BACKENDS[name].description, name)
+        self.backend_combo.currentIndexChanged.connect(self.on_backend_changed)
+        backend_layout.addWidget(self.backend_combo)
+        
+        measure_btn = QPushButton("📏 Measure")
+        measure_btn.setStyleSheet("QPushButton { background-color: #2E86AB; color: white; font-weight: bold; padding: 5px; border-radius: 3px; }")
+        measure_btn.clicked.connect(self.measure_backend_cost)
+        backend_layout.addWidget(measure_btn)
+        backend_layout.addStretch()
+        layout.addLayout(backend_layout)
+        
+        self.compensate_check = QCheckBox("Compensate injection overhead (start each step early by the measured cost)")
+        self.compensate_check.toggled.connect(self.on_compensation_toggled)
+        layout.addWidget(self.compensate_check)
+        
+        # Delivery verification
+        verify_layout = QHBoxLayout()
+        self.verify_check = QCheckBox("Verify delivery (listen for our own keys)")
+        self.verify_check.toggled.connect(self.on_verification_toggled)
+        verify_layout.addWidget(self.verify_check)
+        verify_layout.addWidget(QLabel("Pause after"))
+        self.drop_limit_spin = QSpinBox()
+        self.drop_limit_spin.setRange(0, 1000)
+        self.drop_limit_spin.setValue(0)
+        self.drop_limit_spin.setSuffix(" missed")
+        self.drop_limit_spin.setToolTip("Missing events tolerated before the run pauses itself (0 pauses on the first one)")
+        self.drop_limit_spin.valueChanged.connect(self.keyboard_controller.set_drop_limit)
+        verify_layout.addWidget(self.drop_limit_spin)
+        verify_layout.addStretch()
+        layout.addLayout(verify_layout)
+        
+        self.verify_label = QLabel("")
+        self.verify_label.setWordWrap(True)
+        self.verify_label.setStyleSheet("QLabel { color: #666; font-style: italic; }")
+        layout.addWidget(self.verify_label)
+        
+        # Burst mode
+        burst_layout = QHBoxLayout()
+        self.burst_check = QCheckBox("⚡ Burst mode")
+        self.burst_check.setToolTip("Ignore the timing table and send as fast as the rate limit allows")
+        self.burst_check.toggled.connect(self.update_move_time_preview)
+        burst_layout.addWidget(self.burst_check)
+        burst_layout.addWidget(QLabel("Rate limit:"))
+        self.burst_rate_spin = QSpinBox()
+        self.burst_rate_spin.setRange(0, 100000)
+        self.burst_rate_spin.setValue(100)
+        self.burst_rate_spin.setSuffix(" steps/s")
+        self.burst_rate_spin.setSpecialValueText("Unlimited")
+        self.burst_rate_spin.valueChanged.connect(self.update_move_time_preview)
+        burst_layout.addWidget(self.burst_rate_spin)
+        burst_layout.addWidget(QLabel("Burst:"))
+        self.burst_size_spin = QSpinBox()
+        self.burst_size_spin.setRange(1, 10000)
+        self.burst_size_spin.setValue(10)
+        self.burst_size_spin.setToolTip("Steps that may go out back to back before the rate limit applies")
+        self.burst_size_spin.valueChanged.connect(self.update_move_time_preview)
+        burst_layout.addWidget(self.burst_size_spin)
+        
+        self.probe_btn = QPushButton("🔍 Probe")
+        self.probe_btn.setStyleSheet("QPushButton { background-color: #2E86AB; color: white; font-weight: bold; padding: 5px; border-radius: 3px; }")
+        self.probe_btn.setToolTip("Tap Shift faster and faster to find the highest rate delivered without drops")
+        self.probe_btn.clicked.connect(self.probe_rate)
+        burst_layout.addWidget(self.probe_btn)
+        burst_layout.addStretch()
+        layout.addLayout(burst_layout)
+        
+        self.backend_cost_label = QLabel("")
+        self.backend_cost_label.setStyleSheet("QLabel { color: #666; font-style: italic; }")
+        layout.addWidget(self.backend_cost_label)
         
         parent_layout.addWidget(timing_group)
     
@@ -460,6 +969,37 @@ class AutoKeyApp(QMainWindow):
         step_size_layout.addStretch()
         layout.addLayout(step_size_layout)
         
+        # Motion profile: ramp the press rate up and back down over the move
+        profile_layout = QHBoxLayout()
+        profile_layout.addWidget(QLabel("Motion profile:"))
+        self.profile_combo = QComboBox()
+        for kind, label in MOTION_PROFILES.items():
+            self.profile_combo.addItem(label, kind)
+        profile_layout.addWidget(self.profile_combo)
+        profile_layout.addWidget(QLabel("Max rate:"))
+        self.max_rate_spin = QDoubleSpinBox()
+        self.max_rate_spin.setDecimals(1)
+        self.max_rate_spin.setRange(0.1, 1000.0)
+        self.max_rate_spin.setValue(50.0)
+        self.max_rate_spin.setSuffix(" /s")
+        profile_layout.addWidget(self.max_rate_spin)
+        profile_layout.addWidget(QLabel("Ramp:"))
+        self.ramp_spin = QSpinBox()
+        self.ramp_spin.setRange(1, 100000)
+        self.ramp_spin.setValue(50)
+        self.ramp_spin.setSuffix(" presses")
+        profile_layout.addWidget(self.ramp_spin)
+        profile_layout.addStretch()
+        layout.addLayout(profile_layout)
+        
+        self.move_time_label = QLabel("")
+        self.move_time_label.setStyleSheet("QLabel { color: #666; font-style: italic; }")
+        layout.addWidget(self.move_time_label)
+        
+        self.profile_combo.currentIndexChanged.connect(self.update_move_time_preview)
+        self.max_rate_spin.valueChanged.connect(self.update_move_time_preview)
+        self.ramp_spin.valueChanged.connect(self.update_move_time_preview)
+        
         # Calculate button and result
         calc_layout = QHBoxLayout()
         calc_btn = QPushButton("🧮 Calculate Repetitions")
@@ -504,10 +1044,14 @@ class AutoKeyApp(QMainWindow):
         auto_fill_layout.addStretch()
         layout.addLayout(auto_fill_layout)
         
-        # Timing table
-        self.timing_table = QTableWidget()
-        self.timing_table.setColumnCount(3)
-        self.timing_table.setHorizontalHeaderLabels(["From Key", "To Key", "Delay (ms)"])
+        # Timing table, backed by a model so long sequences stay responsive
+        self.timing_model = TimingTableModel(self)
+        self.timing_model.dataChanged.connect(self.plan_cache.invalidate)
+        self.timing_model.rowsInserted.connect(self.plan_cache.invalidate)
+        self.timing_model.rowsRemoved.connect(self.plan_cache.invalidate)
+        self.timing_model.dataChanged.connect(self.update_move_time_preview)
+        self.timing_table = QTableView()
+        self.timing_table.setModel(self.timing_model)
         
         # Make table columns resize properly
         header = self.timing_table.horizontalHeader()
@@ -515,11 +1059,113 @@ class AutoKeyApp(QMainWindow):
         header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(2, QHeaderView.ResizeMode.Fixed)
         self.timing_table.setColumnWidth(2, 100)
+        # Fixed row heights, so the view never measures rows it does not show
+        self.timing_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        
+        # Edits to the combination reach the table once typing pauses
+        self.timing_table_timer = QTimer(self)
+        self.timing_table_timer.setSingleShot(True)
+        self.timing_table_timer.timeout.connect(self.update_timing_table)
         
         layout.addWidget(self.timing_table)
         
         parent_layout.addWidget(timing_table_group)
     
+    def create_library_group(self, parent_layout):
+        """Create the saved sequence library controls"""
+        library_group = QGroupBox("Sequence Library")
+        layout = QVBoxLayout(library_group)
+        
+        self.library_search = QLineEdit()
+        self.library_search.setPlaceholderText("Search by name or tag...")
+        self.library_search.textChanged.connect(self.refresh_library_list)
+        layout.addWidget(self.library_search)
+        
+        self.library_list = QListWidget()
+        self.library_list.setMaximumHeight(140)
+        self.library_list.setStyleSheet("QListWidget { background-color: white; color: black; border: 1px solid #ccc; border-radius: 4px; }")
+        self.library_list.currentItemChanged.connect(self.on_library_selection)
+        self.library_list.itemChanged.connect(self.on_library_item_checked)
+        layout.addWidget(self.library_list)
+        
+        tags_layout = QHBoxLayout()
+        tags_layout.addWidget(QLabel("Tags:"))
+        self.library_tags_input = QLineEdit()
+        self.library_tags_input.setPlaceholderText("Comma separated, e.g. 'DV, rig 2'")
+        tags_layout.addWidget(self.library_tags_input)
+        
+        save_btn = QPushButton("💾 Save")
+        save_btn.setStyleSheet("QPushButton { background-color: #4CAF50; color: white; font-weight: bold; padding: 5px; border-radius: 3px; }")
+        save_btn.clicked.connect(self.save_to_library)
+        tags_layout.addWidget(save_btn)
+        
+        delete_btn = QPushButton("🗑️ Delete")
+        delete_btn.setStyleSheet("QPushButton { background-color: #f44336; color: white; font-weight: bold; padding: 5px; border-radius: 3px; }")
+        delete_btn.clicked.connect(self.delete_from_library)
+        tags_layout.addWidget(delete_btn)
+        layout.addLayout(tags_layout)
+        
+        # Several saved sequences at once, e.g. a fast DV stepper plus a periodic save
+        multi_layout = QHBoxLayout()
+        multi_layout.addWidget(QLabel("Priority:"))
+        self.priority_spin = QSpinBox()
+        self.priority_spin.setRange(0, 9)
+        self.priority_spin.setToolTip("Saved with the sequence; when checked sequences are due at the same time, lower numbers go first")
+        multi_layout.addWidget(self.priority_spin)
+        run_checked_btn = QPushButton("▶️ Run Checked Together")
+        run_checked_btn.setStyleSheet("QPushButton { background-color: #4CAF50; color: white; font-weight: bold; padding: 5px; border-radius: 3px; }")
+        run_checked_btn.clicked.connect(self.run_checked_sequences)
+        multi_layout.addWidget(run_checked_btn)
+        multi_layout.addStretch()
+        layout.addLayout(multi_layout)
+        
+        # Global hotkeys that start a saved sequence straight away
+        trigger_layout = QHBoxLayout()
+        trigger_layout.addWidget(QLabel("Trigger:"))
+        self.trigger_input = QLineEdit()
+        self.trigger_input.setPlaceholderText("Saved with the sequence, e.g. 'ctrl+alt+1' or 'f9, f9'")
+        trigger_layout.addWidget(self.trigger_input)
+        self.triggers_check = QCheckBox("Global triggers")
+        self.triggers_check.setToolTip("Start a saved sequence immediately when its trigger is pressed in any application")
+        self.triggers_check.toggled.connect(self.on_triggers_toggled)
+        trigger_layout.addWidget(self.triggers_check)
+        layout.addLayout(trigger_layout)
+        
+        parent_layout.addWidget(library_group)
+    
+    def create_telemetry_group(self, parent_layout):
+        """Create per-keystroke timing telemetry controls"""
+        telemetry_group = QGroupBox("Timing Telemetry")
+        layout = QVBoxLayout(telemetry_group)
+        
+        self.telemetry_check = QCheckBox("Record keystroke timing")
+        self.telemetry_check.toggled.connect(self.keyboard_controller.set_telemetry_enabled)
+        layout.addWidget(self.telemetry_check)
+        
+        self.trace_check = QCheckBox("Trace runs (cycle, wait, inject and UI spans)")
+        self.trace_check.toggled.connect(self.keyboard_controller.set_tracing_enabled)
+        layout.addWidget(self.trace_check)
+        
+        self.telemetry_label = QLabel("Enable to measure how closely presses hit their scheduled times.")
+        self.telemetry_label.setWordWrap(True)
+        self.telemetry_label.setStyleSheet("QLabel { color: #666; font-style: italic; margin: 5px; }")
+        layout.addWidget(self.telemetry_label)
+        
+        export_layout = QHBoxLayout()
+        for label, handler in (("💾 Export CSV", self.export_telemetry_csv), ("💾 Export JSON", self.export_telemetry_json)):
+            export_btn = QPushButton(label)
+            export_btn.setStyleSheet("QPushButton { background-color: #2E86AB; color: white; font-weight: bold; padding: 5px; border-radius: 3px; }")
+            export_btn.clicked.connect(handler)
+            export_layout.addWidget(export_btn)
+        trace_btn = QPushButton("💾 Export Trace")
+        trace_btn.setStyleSheet("QPushButton { background-color: #2E86AB; color: white; font-weight: bold; padding: 5px; border-radius: 3px; }")
+        trace_btn.clicked.connect(self.export_trace)
+        export_layout.addWidget(trace_btn)
+        export_layout.addStretch()
+        layout.addLayout(export_layout)
+        
+        parent_layout.addWidget(telemetry_group)
+    
     def create_control_buttons(self, parent_layout):
         """Create control buttons"""
         button_layout = QHBoxLayout()
@@ -535,7 +1181,23 @@ class AutoKeyApp(QMainWindow):
         self.stop_btn.setEnabled(False)
         button_layout.addWidget(self.stop_btn)
         
+        self.pause_btn = QPushButton("⏸️ Pause")
+        self.pause_btn.setStyleSheet("QPushButton { background-color: #FF9500; color: white; font-weight: bold; padding: 10px; border-radius: 5px; }")
+        self.pause_btn.clicked.connect(self.toggle_pause)
+        self.pause_btn.setEnabled(False)
+        button_layout.addWidget(self.pause_btn)
+        
         parent_layout.addLayout(button_layout)
+        
+        # Global emergency stop, works while another window has focus
+        kill_key_layout = QHBoxLayout()
+        kill_key_layout.addWidget(QLabel("Emergency stop key:"))
+        self.kill_key_combo = QComboBox()
+        self.kill_key_combo.addItems(["Pause", "F12", "Scroll Lock", "ESC"])
+        self.kill_key_combo.currentTextChanged.connect(self.on_kill_key_changed)
+        kill_key_layout.addWidget(self.kill_key_combo)
+        kill_key_layout.addStretch()
+        parent_layout.addLayout(kill_key_layout)
     
     def create_footer(self, parent_layout):
         """Create footer with logo and credits"""
@@ -550,18 +1212,16 @@ class AutoKeyApp(QMainWindow):
         logo_layout.addStretch()  # Center the logo
         
         footer_logo_label = QLabel()
-        logo_path = "asset/img/logo.png"
-        if os.path.exists(logo_path):
-            pixmap = QPixmap(logo_path)
+        pixmap = self.get_logo_pixmap()
+        if pixmap is not None:
             # Scale the footer logo to a smaller size (32x32 pixels)
             scaled_pixmap = pixmap.scaled(32, 32, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
             footer_logo_label.setPixmap(scaled_pixmap)
-            print(f"Footer logo loaded from: {logo_path}")
         else:
             # Fallback to emoji if no image file
             footer_logo_label.setText("🏥")
             footer_logo_label.setFont(QFont("Arial", 16))
-            print(f"Footer logo file not found at: {logo_path}, using emoji fallback")
+            logger.debug("Footer logo file not found at: %s, using emoji fallback", LOGO_PATH)
         
         footer_logo_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         logo_layout.addWidget(footer_logo_label)
@@ -579,9 +1239,6 @@ class AutoKeyApp(QMainWindow):
     
     def setup_timers(self):
         """Setup timers for automation"""
-        self.press_timer = QTimer()
-        self.press_timer.timeout.connect(self.execute_key_press)
-        
         self.duration_timer = QTimer()
         self.duration_timer.timeout.connect(self.stop_pressing)
         self.duration_timer.setSingleShot(True)
@@ -594,8 +1251,19 @@ class AutoKeyApp(QMainWindow):
         self.start_countdown_timer = QTimer()
         self.start_countdown_timer.timeout.connect(self.start_countdown_tick)
         
+        # Live telemetry statistics refresh
+        self.telemetry_timer = QTimer()
+        self.telemetry_timer.timeout.connect(self.update_telemetry_stats)
+        
+        # Run status, redrawn at a fixed rate however fast the repeats go
+        self.progress_timer = QTimer()
+        self.progress_timer.timeout.connect(self.refresh_progress)
+        
         self.press_count = 0
         self.target_repeats = 0
+        self.cycle_time = 1.0
+        self.motion_timeline = None  # MotionTimeline of a profiled run, for the ETA
+        self.is_paused = False
         self.start_time = 0
         self.countdown_value = 0
         self.start_countdown_value = 0
@@ -623,6 +1291,110 @@ class AutoKeyApp(QMainWindow):
         elif preset_text == "Custom":
             self.combo_input.clear()
     
+    def on_backend_changed(self, index):
+        """Switch the keyboard output backend"""
+        name = self.backend_combo.itemData(index)
+        if self.is_running or self.is_testing:
+            return
+        try:
+            self.keyboard_controller.set_backend(name)
+        except (OSError, ImportError, ValueError) as e:
+            self.status_label.setText(f"❌ Could not open {name} backend: {e}")
+            self.backend_combo.blockSignals(True)
+            self.backend_combo.setCurrentIndex(self.backend_combo.findData(self.keyboard_controller.backend_name))
+            self.backend_combo.blockSignals(False)
+            return
+        # Resolved key objects belong to the old backend
+        self.plan_cache.clear()
+        self.recording_plan = None
+        self.backend_cost_label.setText("")
+        if self.keyboard_controller.overhead is not None:
+            self.show_compensation(self.keyboard_controller.overhead.calibration)
+        self.status_label.setText(f"Output backend: {BACKENDS[name].description}")
+    
+    def measure_backend_cost(self):
+        """Measure and show the backend's per-event cost"""
+        if self.is_running or self.is_testing:
+            return
+        cost = self.keyboard_controller.measure_backend_cost()
+        self.backend_cost_label.setText(f"{cost['backend']}: {cost['p50_ns'] / 1000:.1f} µs/event median, "
+                                        f"{cost['p99_ns'] / 1000:.1f} µs p99 ({cost['samples']} taps of shift, "
+                                        f"saved for this machine)")
+    
+    def on_compensation_toggled(self, checked):
+        """Turn injection overhead compensation on or off"""
+        if self.is_running or self.is_testing:
+            # Calibrating taps shift, which must not interleave with a run
+            self.compensate_check.blockSignals(True)
+            self.compensate_check.setChecked(not checked)
+            self.compensate_check.blockSignals(False)
+            return
+        cost = self.keyboard_controller.set_compensation_enabled(checked)
+        if cost is not None:
+            self.show_compensation(cost)
+        else:
+            self.backend_cost_label.setText("")
+    
+    def on_verification_toggled(self, checked):
+        """Turn loopback delivery verification on or off"""
+        if self.is_running or self.is_testing:
+            # The verifier is handed to the engine when a run starts
+            self.verify_check.blockSignals(True)
+            self.verify_check.setChecked(not checked)
+            self.verify_check.blockSignals(False)
+            return
+        try:
+            self.keyboard_controller.set_verification_enabled(checked, self.drop_limit_spin.value())
+        except Exception as e:
+            self.verify_check.blockSignals(True)
+            self.verify_check.setChecked(False)
+            self.verify_check.blockSignals(False)
+            self.verify_label.setText(f"❌ Could not start the loopback listener: {e}")
+            return
+        self.verify_label.setText("Every key sent is checked against the system's keyboard events." if checked else "")
+    
+    def show_verify_report(self):
+        """Show the delivery report of the last run"""
+        verifier = self.keyboard_controller.verifier
+        if verifier is None:
+            return
+        # Anything not seen by now has been waiting longer than the timeout
+        verifier.expire(time.perf_counter_ns())
+        report = verifier.report()
+        prefix = "✅" if not (report['missing'] or report['reordered']) else "⚠️"
+        self.verify_label.setText(f"{prefix} {format_report(report)}")
+    
+    def probe_rate(self):
+        """Start the burst rate probe"""
+        if (self.is_running or self.is_testing or self.start_countdown_timer.isActive()
+                or self.keyboard_controller.is_probing):
+            return
+        self.probe_btn.setEnabled(False)
+        self.start_btn.setEnabled(False)
+        self.status_label.setText("🔍 Probing the highest drop-free rate (taps Shift for several seconds)...")
+        self.keyboard_controller.probe_rate()
+    
+    def on_rate_probed(self, rate_hz, error):
+        """Use the probe result as the burst rate limit"""
+        self.probe_btn.setEnabled(True)
+        self.start_btn.setEnabled(not self.is_running)
+        if error:
+            self.status_label.setText(f"❌ Rate probe failed: {error}")
+        elif rate_hz == 0:
+            self.status_label.setText("⚠️ Keys were lost even at the slowest probe rate; keep burst mode off.")
+        else:
+            limit = max(1, int(rate_hz * PROBE_SAFETY))
+            self.burst_rate_spin.setValue(limit)
+            self.burst_check.setChecked(True)
+            self.status_label.setText(f"🔍 No drops up to {rate_hz} steps/s; burst rate limit set to {limit} steps/s.")
+    
+    def show_compensation(self, cost):
+        """Show the per-event cost that steps are started ahead by"""
+        source = "re-calibrated during a run" if cost.get('source') == 'online' else "calibrated"
+        measured = time.strftime('%Y-%m-%d %H:%M', time.localtime(cost['measured_at']))
+        self.backend_cost_label.setText(f"{cost['backend']}: steps start {cost['p50_ns'] / 1000:.1f} µs/event early "
+                                        f"({source} {measured})")
+    
     def on_stop_key_changed(self, stop_key_text):
         """Handle stop key selection change"""
         key_mappings = {
@@ -638,6 +1410,18 @@ class AutoKeyApp(QMainWindow):
         if stop_key_text in key_mappings:
             self.keyboard_controller.set_stop_key(key_mappings[stop_key_text])
     
+    def on_kill_key_changed(self, kill_key_text):
+        """Handle emergency stop key selection change"""
+        key_mappings = {
+            "Pause": "pause",
+            "F12": "f12",
+            "Scroll Lock": "scroll_lock",
+            "ESC": "esc"
+        }
+        
+        if kill_key_text in key_mappings:
+            self.keyboard_controller.set_kill_key(key_mappings[kill_key_text])
+    
     def start_recording(self):
         """Start the recording process with countdown"""
         if self.is_recording:
@@ -675,121 +1459,164 @@ class AutoKeyApp(QMainWindow):
         
         # Update timing table
         self.update_timing_table()
+        event_log = self.keyboard_controller.event_log
+        if self.use_recorded_timing_check.isChecked():
+            self.set_timing_intervals(event_log.intervals_ms())
+        
+        self.recording_plan = None
+        self.macro = None
+        self.replay_recording_check.setEnabled(len(event_log) > 0)
+        self.replay_recording_check.setText(f"Replay recording with original timing ({len(event_log)} events)")
     
-    def update_timing_table(self):
-        """Update the timing table based on current key combination"""
-        keys = self.get_current_keys()
-        if not keys:
-            self.timing_table.setRowCount(0)
-            return
-        
-        # Create rows for each transition
-        transitions = []
-        if len(keys) == 1:
-            # For single key, create transition from key to itself (for repeat delay)
-            key = keys[0]
-            transitions.append((key, key))
+    def on_replay_recording_toggled(self, checked):
+        """Switch between the recording and the combination/table as the run source"""
+        if checked:
+            self.status_label.setText("Start and Test will replay the recording with its original timing.")
         else:
-            # For multiple keys, create transitions between each key
-            for i in range(len(keys)):
-                from_key = keys[i]
-                to_key = keys[(i + 1) % len(keys)]  # Wrap around to first key
-                transitions.append((from_key, to_key))
-        
-        self.timing_table.setRowCount(len(transitions))
-        
-        for row, (from_key, to_key) in enumerate(transitions):
-            # From key (read-only)
-            from_item = QTableWidgetItem(from_key)
-            from_item.setFlags(from_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.timing_table.setItem(row, 0, from_item)
-            
-            # To key (read-only)
-            to_item = QTableWidgetItem(to_key)
-            to_item.setFlags(to_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.timing_table.setItem(row, 1, to_item)
-            
-            # Delay (editable)
-            delay_item = QTableWidgetItem("100")  # Default 100ms
-            self.timing_table.setItem(row, 2, delay_item)
+            self.status_label.setText("Start and Test will use the combination and timing table.")
+    
+    def schedule_timing_table_update(self):
+        """Restart the debounce timer after an edit to the combination"""
+        self.timing_table_timer.start(TABLE_DEBOUNCE_MS)
+    
+    def update_timing_table(self):
+        """Bring the timing table in line with the current key combination
+        
+        Rows of steps that are still there keep their delays; a single key
+        gets one row from the key to itself (the repeat delay).
+        """
+        self.timing_table_timer.stop()
+        self.timing_model.set_rows(parse_rows(self.combo_input.text()))
+        # The cycle may change without any row changing, e.g. a new repeat count
+        self.update_move_time_preview()
+    
+    def flush_timing_table(self):
+        """Apply a pending combination edit before the table is read or written"""
+        if self.timing_table_timer.isActive():
+            self.update_timing_table()
+    
+    def set_timing_intervals(self, intervals):
+        """Fill the "Delay (ms)" column, row by row"""
+        self.flush_timing_table()
+        self.timing_model.set_delays(intervals)
     
     def auto_fill_timing(self):
         """Auto-fill all timing intervals with the same value"""
-        fill_value = str(self.auto_fill_spin.value())
-        for row in range(self.timing_table.rowCount()):
-            delay_item = QTableWidgetItem(fill_value)
-            self.timing_table.setItem(row, 2, delay_item)
+        self.flush_timing_table()
+        self.timing_model.fill(self.auto_fill_spin.value())
     
     def get_timing_intervals(self):
         """Get timing intervals from the table"""
-        intervals = []
-        for row in range(self.timing_table.rowCount()):
-            delay_item = self.timing_table.item(row, 2)
-            if delay_item:
-                try:
-                    delay = int(delay_item.text())
-                    intervals.append(delay)
-                except ValueError:
-                    intervals.append(100)  # Default fallback
-            else:
-                intervals.append(100)
-        return intervals
+        self.flush_timing_table()
+        return self.timing_model.delays.tolist()
     
     def get_current_keys(self):
         """Get the current key combination"""
-        combo_text = self.combo_input.text().strip()
-        if not combo_text:
-            return None
-        print(f"Current key combination: {combo_text}")
-        return [key.strip() for key in combo_text.split('+')]
+        return parse_keys(self.combo_input.text()) or None
+    
+    def get_plan(self):
+        """Get the compiled plan, reading the widgets only after an edit
+
+        Returns None (and explains why in the status line) if there is
+        nothing to send.
+        """
+        if self.replay_recording_check.isChecked():
+            return self.get_recording_plan()
+        plan = self.plan_cache.current()
+        if plan is None:
+            try:
+                plan = self.plan_cache.get(self.combo_input.text(), self.get_timing_intervals())
+            except ValueError as e:
+                self.status_label.setText(f"❌ {e}")
+                return None
+        if plan is None:
+            self.status_label.setText("Please enter a key combination first.")
+        return plan
+    
+    def get_recording_plan(self):
+        """Plan that replays the last recording (or opened macro) with its original timing"""
+        if self.recording_plan is None:
+            try:
+                if self.macro is not None:
+                    self.recording_plan = MacroPlan(self.macro, self.keyboard_controller.resolve_key)
+                else:
+                    self.recording_plan = compile_recording(self.keyboard_controller.event_log,
+                                                            self.keyboard_controller.resolve_key)
+            except ValueError as e:
+                self.status_label.setText(f"❌ {e}")
+                return None
+        if self.recording_plan is None:
+            self.status_label.setText("Nothing recorded yet.")
+        return self.recording_plan
     
     def test_combination(self):
         """Test the current key combination"""
-        keys = self.get_current_keys()
-        if keys:
+        if self.is_running or self.is_testing or self.keyboard_controller.is_probing:
+            return
+        plan = self.get_plan()
+        if plan:
             self.status_label.setText("Testing key combination...")
-            timing_intervals = self.get_timing_intervals()
-            # For testing, include the final delay to show the complete sequence
-            success = self.keyboard_controller.send_key_combination(keys, timing_intervals, include_final_delay=True)
-            if success:
-                self.status_label.setText(f"Test successful! Sequential keys: {' → '.join(keys)}")
+            self.is_testing = True
+            self.start_btn.setEnabled(False)
+            if self.replay_recording_check.isChecked():
+                self.tested_description = f"Replayed {len(plan)} recorded events"
             else:
-                self.status_label.setText("Test failed! Check your key combination.")
-        else:
-            self.status_label.setText("Please enter a key combination first.")
+                names = list(islice(plan.names, TEST_DESCRIPTION_STEPS + 1))
+                if len(names) > TEST_DESCRIPTION_STEPS:
+                    names[-1] = f"… ({len(plan)} steps)"
+                self.tested_description = f"Sequential keys: {' → '.join(names)}"
+            self.keyboard_controller.start_playback(plan, repeats=1)
     
     def start_pressing(self):
         """Start the key pressing automation"""
-        keys = self.get_current_keys()
-        if not keys:
-            self.status_label.setText("Please enter a key combination first.")
+        plan = self.get_plan()
+        if not plan:
+            self.reset_run_buttons()
             return
         
-        self.is_running = True
-        self.press_count = 0
-        self.start_time = time.time()
-        
         # Set target repeats if in repeat mode
         if self.timed_radio.isChecked():
             self.target_repeats = self.repeat_count_spin.value()
         else:
             self.target_repeats = 0  # Continuous mode
         
+        # A motion profile only applies to a known number of repeats
+        cycle_lengths_ns = None
+        rate_limit = None
+        self.motion_timeline = None
+        if self.burst_check.isChecked():
+            # Burst mode replaces both the timing table and the motion profile
+            rate_limit = (self.burst_rate_spin.value(), self.burst_size_spin.value())
+        elif self.target_repeats > 0 and self.profile_combo.currentData() != CONSTANT_PROFILE:
+            from autokey.motion import MotionTimeline
+            try:
+                self.motion_timeline = MotionTimeline(self.profile_combo.currentData(), self.target_repeats, plan.cycle_ns,
+                                                      self.max_rate_spin.value(), self.ramp_spin.value())
+            except ValueError as e:
+                self.status_label.setText(f"❌ {e}")
+                self.reset_run_buttons()
+                return
+            cycle_lengths_ns = self.motion_timeline.cycle_lengths()
+        
+        self.is_running = True
+        self.press_count = 0
+        self.start_time = time.time()
+        
         # Update UI
         self.start_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
+        self.pause_btn.setEnabled(True)
         
-        # Calculate total cycle time from timing table for the timer
-        timing_intervals = self.get_timing_intervals()
-        if timing_intervals and len(timing_intervals) > 0:
-            # Use sum of all timing intervals as the cycle time
-            cycle_time = sum(timing_intervals)
+        # One cycle of the plan, used for the ETA; None means estimate it from progress
+        if rate_limit is None:
+            self.cycle_time = plan.cycle_ns / 1e9
         else:
-            # Default fallback if no timing table
-            cycle_time = 1000  # 1 second default
+            self.cycle_time = len(plan) / rate_limit[0] if rate_limit[0] else None
         
-        # Start pressing with calculated cycle time
-        self.press_timer.start(cycle_time)
+        self.keyboard_controller.start_playback(plan, self.target_repeats, cycle_lengths_ns, rate_limit)
+        self.progress_timer.start(PROGRESS_REFRESH_MS)
+        if self.telemetry_check.isChecked():
+            self.telemetry_timer.start(500)
         
         # Set status message
         if self.timed_radio.isChecked():
@@ -797,69 +1624,238 @@ class AutoKeyApp(QMainWindow):
         else:
             self.status_label.setText("Started! Press 'Stop' to end.")
     
-    def execute_key_press(self):
-        """Execute a single key press"""
-        if not self.is_running:
+    def refresh_progress(self):
+        """Timer slot: show the playback thread's progress counter"""
+        if not self.is_running or self.is_paused:
             return
-        
-        # Check if we've reached the target number of repeats
-        if self.target_repeats > 0 and self.press_count >= self.target_repeats:
-            self.stop_pressing()
+        engine = self.keyboard_controller.active_engine
+        if not engine.is_running:
             return
-            
-        keys = self.get_current_keys()
-        if keys:
-            # Always use sequential timing with timing table
-            timing_intervals = self.get_timing_intervals()
-            print(f"Using sequential timing: {timing_intervals}")
-            # For automation, don't include the final delay - let the timer handle it
-            success = self.keyboard_controller.send_key_combination(keys, timing_intervals, include_final_delay=False)
-                
-            if success:
-                self.press_count += 1
-                elapsed = time.time() - self.start_time
-                
-                if self.target_repeats > 0:
-                    remaining = self.target_repeats - self.press_count
-                    # Calculate estimated time remaining
-                    if remaining > 0:
-                        cycle_time = sum(timing_intervals) / 1000.0 if timing_intervals else 1.0  # Convert ms to seconds
-                        estimated_time_remaining = remaining * cycle_time
-                        time_remaining_str = self.format_time_remaining(estimated_time_remaining)
-                        self.status_label.setText(f"Running... Completed: {self.press_count}/{self.target_repeats}, Remaining: {remaining} ({time_remaining_str})")
-                    else:
-                        self.status_label.setText(f"Running... Completed: {self.press_count}/{self.target_repeats}, Finishing...")
-                else:
-                    self.status_label.setText(f"Running... Presses: {self.press_count}, Elapsed: {elapsed:.1f}s")
-    
-    def stop_pressing(self):
-        """Stop the key pressing automation"""
-        self.is_running = False
-        self.press_timer.stop()
-        self.duration_timer.stop()
-        self.start_countdown_timer.stop()  # Also stop countdown timer if running
+        if engine.paused_for_drops:
+            engine.paused_for_drops = False
+            self.on_delivery_paused()
+            return
+        started_ns = time.perf_counter_ns()
+        self.press_count = engine.completed
+        elapsed = (started_ns - engine.run_start_ns) / 1e9
         
-        # Update UI
-        self.start_btn.setEnabled(True)
-        self.stop_btn.setEnabled(False)
+        if self.target_repeats > 0:
+            remaining = self.target_repeats - self.press_count
+            # Calculate estimated time remaining
+            if remaining > 0:
+                if self.motion_timeline is not None:
+                    estimated_time_remaining = self.motion_timeline.remaining_ns(self.press_count) / 1e9
+                elif self.cycle_time is None:
+                    estimated_time_remaining = remaining * elapsed / max(self.press_count, 1)
+                else:
+                    estimated_time_remaining = remaining * self.cycle_time
+                time_remaining_str = self.format_time_remaining(estimated_time_remaining)
+                self.status_label.setText(f"Running... Completed: {self.press_count}/{self.target_repeats}, Remaining: {remaining} ({time_remaining_str})")
+            else:
+                self.status_label.setText(f"Running... Completed: {self.press_count}/{self.target_repeats}, Finishing...")
+        else:
+            self.status_label.setText(f"Running... Presses: {self.press_count}, Elapsed: {elapsed:.1f}s")
         
-        elapsed = time.time() - self.start_time if self.start_time > 0 else 0
+        trace = self.keyboard_controller.gui_trace
+        if trace is not None:
+            trace.span(UI_UPDATE, started_ns, time.perf_counter_ns(), self.press_count)
+    
+    def on_playback_finished(self, count, elapsed, reason):
+        """Handle the end of a test or automation run"""
+        recalibrated = self.keyboard_controller.save_recalibration()
+        if recalibrated is not None:
+            self.show_compensation(recalibrated)
+        if self.keyboard_controller.verifier is not None:
+            # Give the last keys the full timeout to show up
+            QTimer.singleShot(VERIFY_TIMEOUT_MS, self.show_verify_report)
+        if self.is_testing:
+            self.is_testing = False
+            self.start_btn.setEnabled(True)
+            if reason == 'completed':
+                self.status_label.setText(f"Test successful! {self.tested_description}")
+            else:
+                self.status_label.setText("Test failed! Check your key combination.")
+            return
         
-        if self.target_repeats > 0:
+        self.is_running = False
+        self.press_count = count
+        self.reset_run_buttons()
+        self.progress_timer.stop()
+        self.telemetry_timer.stop()
+        self.update_telemetry_stats()
+        
+        multi_tracks, self.multi_tracks = self.multi_tracks, None
+        if reason == 'error':
+            self.status_label.setText(f"❌ Error after {count} repeats. Check your key combination.")
+        elif reason == 'aborted':
+            latency_ns = self.keyboard_controller.active_engine.abort_latency_ns
+            self.status_label.setText(f"🛑 Emergency stop after {count} repeats "
+                                      f"(last key {latency_ns / 1e6:.2f} ms after the stop key)")
+        elif multi_tracks and reason == 'completed':
+            self.status_label.setText(f"✅ Completed! {len(multi_tracks)} sequences, {count} repeats in {elapsed:.1f}s")
+        elif self.target_repeats > 0:
             if self.press_count >= self.target_repeats:
                 self.status_label.setText(f"✅ Completed! {self.press_count} repeats in {elapsed:.1f}s")
             else:
                 self.status_label.setText(f"⏹️ Stopped. {self.press_count}/{self.target_repeats} repeats in {elapsed:.1f}s")
         else:
             self.status_label.setText(f"⏹️ Stopped. Total presses: {self.press_count}, Duration: {elapsed:.1f}s")
+    
+    def stop_pressing(self):
+        """Stop the key pressing automation"""
+        self.duration_timer.stop()
+        self.start_countdown_timer.stop()  # Also stop countdown timer if running
+        
+        if self.is_running:
+            # The status is updated once the playback thread reports it stopped
+            self.keyboard_controller.stop_playback()
+            return
+        
+        self.reset_run_buttons()
+        self.status_label.setText("⏹️ Stopped.")
+    
+    def on_delivery_paused(self):
+        """The engine paused itself because keys were not delivered"""
+        verifier = self.keyboard_controller.verifier
+        self.is_paused = True
+        self.pause_btn.setText("▶️ Resume")
+        missing = verifier.missing if verifier is not None else 0
+        self.status_label.setText(f"⏸️ Paused: {missing} keys were not delivered. Check the target, then Resume.")
+        if verifier is not None:
+            self.verify_label.setText(f"⚠️ {format_report(verifier.report())}")
+    
+    def toggle_pause(self):
+        """Pause or resume the running automation"""
+        if not self.is_running:
+            return
+        if self.is_paused:
+            self.keyboard_controller.resume_playback()
+            self.is_paused = False
+            self.pause_btn.setText("⏸️ Pause")
+            self.status_label.setText("Resumed.")
+        else:
+            self.keyboard_controller.pause_playback()
+            self.is_paused = True
+            self.pause_btn.setText("▶️ Resume")
+            self.status_label.setText(f"⏸️ Paused after {self.press_count} repeats.")
+    
+    def update_telemetry_stats(self):
+        """Show the live lateness statistics of the current run"""
+        started_ns = time.perf_counter_ns()
+        if self.keyboard_controller.active_engine is self.keyboard_controller.multi_engine:
+            self.telemetry_label.setText("\n".join(f"{track.name} ({track.count} repeats): {format_stats(track.telemetry.stats())}"
+                                                    for track in self.keyboard_controller.multi_engine.tracks))
+        else:
+            telemetry = self.keyboard_controller.engine.telemetry
+            if telemetry is None:
+                return
+            self.telemetry_label.setText(format_stats(telemetry.stats()))
+        
+        trace = self.keyboard_controller.gui_trace
+        if trace is not None:
+            trace.span(STATS_UPDATE, started_ns, time.perf_counter_ns())
+    
+    def export_telemetry_csv(self):
+        """Export the recorded keystroke timing as CSV"""
+        self.export_telemetry("CSV files (*.csv)", "csv")
+    
+    def export_telemetry_json(self):
+        """Export the recorded keystroke timing and statistics as JSON"""
+        self.export_telemetry("JSON files (*.json)", "json")
+    
+    def export_telemetry(self, file_filter, extension):
+        """Ask for a file name and write the telemetry of the last run"""
+        telemetry = self.keyboard_controller.telemetry
+        if telemetry is None or telemetry.count == 0:
+            self.status_label.setText("No keystroke timing recorded yet.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export keystroke timing", f"autokey_timing.{extension}", file_filter)
+        if not path:
+            return
+        try:
+            if extension == "csv":
+                telemetry.export_csv(path)
+            else:
+                telemetry.export_json(path)
+            self.status_label.setText(f"Timing exported to {path}")
+        except OSError as e:
+            self.status_label.setText(f"❌ Could not export timing: {e}")
+    
+    def export_trace(self):
+        """Ask for a file name and write the trace of the last run"""
+        trace = self.keyboard_controller.playback_trace
+        if trace is None or trace.count == 0:
+            self.status_label.setText("No trace recorded yet. Enable tracing and start a run.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export trace", "autokey_trace.json", "Trace files (*.json)")
+        if not path:
+            return
+        try:
+            spans = self.keyboard_controller.export_trace(path)
+            self.status_label.setText(f"{spans} spans exported to {path} (open in ui.perfetto.dev)")
+        except OSError as e:
+            self.status_label.setText(f"❌ Could not export trace: {e}")
+    
+    def save_macro_file(self):
+        """Save the last recording as a binary macro file"""
+        event_log = self.keyboard_controller.event_log
+        if not len(event_log):
+            self.status_label.setText("Nothing recorded yet.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Save macro", f"autokey_macro{MACRO_EXTENSION}",
+                                              f"AutoKey macros (*{MACRO_EXTENSION})")
+        if not path:
+            return
+        try:
+            count = save_macro(path, event_log)
+            self.status_label.setText(f"💾 Saved {count} events to {path}")
+        except OSError as e:
+            self.status_label.setText(f"❌ Could not save macro: {e}")
+    
+    def open_macro_file(self):
+        """Open a macro file for replay with its original timing"""
+        if self.is_running or self.is_testing:
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Open macro", "", f"AutoKey macros (*{MACRO_EXTENSION})")
+        if not path:
+            return
+        try:
+            # A playing plan keeps the previous macro mapped until it is done
+            self.macro = Macro(path)
+        except (OSError, ValueError) as e:
+            self.status_label.setText(f"❌ Could not open macro: {e}")
+            return
+        self.recording_plan = None
+        self.replay_recording_check.setEnabled(True)
+        self.replay_recording_check.setText(f"Replay {os.path.basename(path)} with original timing ({len(self.macro)} events)")
+        self.replay_recording_check.setChecked(True)
+        self.status_label.setText(f"📂 Opened {os.path.basename(path)}: {len(self.macro)} events, "
+                                  f"{self.format_move_time(self.macro.duration_ns / 1e9)} long")
+    
+    def reset_run_buttons(self):
+        """Return the control buttons to their idle state"""
+        self.is_paused = False
+        self.start_btn.setEnabled(True)
+        self.stop_btn.setEnabled(False)
+        self.pause_btn.setEnabled(False)
+        self.pause_btn.setText("⏸️ Pause")
 
     def start_countdown(self):
         """Start the 3-second countdown before automation begins"""
-        keys = self.get_current_keys()
-        if not keys:
+        if self.is_running or self.is_testing or self.keyboard_controller.is_probing:
+            return
+        if self.replay_recording_check.isChecked():
+            # A recording or opened macro plays without a combination
+            if self.get_recording_plan() is None:
+                return
+        elif not self.get_current_keys():
             self.status_label.setText("Please enter a key combination first.")
             return
-            
+        self.pending_tracks = None
+        self.begin_countdown()
+    
+    def begin_countdown(self):
+        """Count down from 3 before a run starts"""
         # Disable start button during countdown
         self.start_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
@@ -881,7 +1877,10 @@ class AutoKeyApp(QMainWindow):
             # Countdown finished, stop timer and start automation
             self.start_countdown_timer.stop()
             self.status_label.setText("Starting automation...")
-            self.start_pressing()
+            if self.pending_tracks is not None:
+                self.start_multi_run()
+            else:
+                self.start_pressing()
     
     def calculate_dv_repetitions(self):
         """Calculate the number of repetitions based on DV values and step size"""
@@ -921,10 +1920,281 @@ class AutoKeyApp(QMainWindow):
         self.repeat_count_spin.setValue(repetitions)
         self.timed_radio.setChecked(True)  # Switch to "For specific number of repeats"
         
+        self.update_move_time_preview()
+        
         # Update status
         self.status_label.setText(f"DV calculation complete: {repetitions} repetitions calculated")
         
-        print(f"DV Calculation: {current_dv:.3f} → {final_dv:.3f} mm, step: {step_size} presses/0.001mm, repetitions: {repetitions}")
+        logger.info("DV Calculation: %.3f → %.3f mm, step: %s presses/0.001mm, repetitions: %d",
+                    current_dv, final_dv, step_size, repetitions)
+    
+    def open_library(self):
+        """Open the sequence library and list its metadata"""
+        try:
+            self.library = SequenceLibrary()
+        except (OSError, sqlite3.Error) as e:
+            self.library_search.setEnabled(False)
+            self.library_search.setPlaceholderText(f"Library unavailable: {e}")
+            return
+        self.refresh_library_list()
+    
+    def refresh_library_list(self):
+        """Show the saved sequences matching the search text"""
+        if self.library is None:
+            return
+        self.library_list.blockSignals(True)
+        self.library_list.clear()
+        for info in self.library.search(self.library_search.text()):
+            label = info.name
+            if info.tags:
+                label += f"  [{', '.join(info.tags)}]"
+            if info.trigger:
+                label += f"  ⚡ {info.trigger}"
+            item = QListWidgetItem(f"{label}  ({info.step_count} keys, {info.cycle_ms} ms)")
+            item.setData(Qt.ItemDataRole.UserRole, info.id)
+            item.setData(Qt.ItemDataRole.UserRole + 1, info.name)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked if info.id in self.checked_sequence_ids else Qt.CheckState.Unchecked)
+            self.library_list.addItem(item)
+        self.library_list.blockSignals(False)
+    
+    def on_library_item_checked(self, item):
+        """Remember which sequences are checked for a combined run, across searches"""
+        sequence_id = item.data(Qt.ItemDataRole.UserRole)
+        if item.checkState() == Qt.CheckState.Checked:
+            self.checked_sequence_ids.add(sequence_id)
+        else:
+            self.checked_sequence_ids.discard(sequence_id)
+    
+    def on_library_selection(self, item, previous=None):
+        """Load the selected sequence into the combination, timing table and settings"""
+        if item is None or self.library is None or self.is_running or self.is_testing:
+            return
+        self.load_library_sequence(item.data(Qt.ItemDataRole.UserRole))
+    
+    def load_library_sequence(self, sequence_id):
+        """Put a saved sequence into the widgets; returns it, or None if it is gone"""
+        try:
+            sequence = self.library.load(sequence_id)
+        except KeyError:
+            self.refresh_library_list()
+            return None
+        
+        self.preset_combo.blockSignals(True)
+        self.preset_combo.setCurrentText("Custom")
+        self.preset_combo.blockSignals(False)
+        self.replay_recording_check.setChecked(False)
+        self.combo_input.setText(sequence.combination)
+        self.set_timing_intervals(sequence.intervals)
+        self.apply_sequence_settings(sequence.settings)
+        self.library_tags_input.setText(', '.join(sequence.tags))
+        self.trigger_input.setText(sequence.trigger)
+        self.status_label.setText(f"📂 Loaded '{sequence.name}' from the library")
+        return sequence
+    
+    def on_triggers_toggled(self, checked):
+        """Start or stop listening for global triggers"""
+        if checked:
+            self.refresh_triggers()
+        else:
+            self.keyboard_controller.disable_triggers()
+            self.status_label.setText("Global triggers off.")
+    
+    def refresh_triggers(self):
+        """Hand the library's triggers to the hotkey listener"""
+        if not self.triggers_check.isChecked() or self.library is None:
+            return
+        triggers = self.library.triggers()
+        invalid = self.keyboard_controller.set_triggers(triggers)
+        if invalid:
+            self.status_label.setText(f"❌ Ignoring unreadable triggers: {', '.join(invalid)}")
+        else:
+            self.status_label.setText(f"⚡ Listening for {len(triggers)} global triggers")
+    
+    def on_trigger_fired(self, sequence_id):
+        """Run a library sequence right away when its global trigger is pressed"""
+        if (self.is_running or self.is_testing or self.is_recording or self.library is None
+                or self.keyboard_controller.is_probing):
+            return
+        self.start_countdown_timer.stop()
+        sequence = self.load_library_sequence(sequence_id)
+        if sequence is not None:
+            self.start_pressing()
+            if self.is_running:
+                self.status_label.setText(f"⚡ Triggered '{sequence.name}'")
+    
+    def sequence_settings(self):
+        """Run settings saved alongside a sequence"""
+        return {
+            'stop_key': self.stop_key_combo.currentText(),
+            'step_size': self.step_size_spin.value(),
+            'repeats': self.repeat_count_spin.value() if self.timed_radio.isChecked() else 0,
+            'profile': self.profile_combo.currentData(),
+            'max_rate': self.max_rate_spin.value(),
+            'ramp': self.ramp_spin.value(),
+            'priority': self.priority_spin.value(),
+        }
+    
+    def apply_sequence_settings(self, settings):
+        """Restore settings saved by sequence_settings; missing ones are left alone"""
+        if 'stop_key' in settings:
+            self.stop_key_combo.setCurrentText(settings['stop_key'])
+        if 'step_size' in settings:
+            self.step_size_spin.setValue(settings['step_size'])
+        if settings.get('repeats'):
+            self.repeat_count_spin.setValue(settings['repeats'])
+            self.timed_radio.setChecked(True)
+        elif 'repeats' in settings:
+            self.continuous_radio.setChecked(True)
+        if 'profile' in settings:
+            index = self.profile_combo.findData(settings['profile'])
+            if index >= 0:
+                self.profile_combo.setCurrentIndex(index)
+        if 'max_rate' in settings:
+            self.max_rate_spin.setValue(settings['max_rate'])
+        if 'ramp' in settings:
+            self.ramp_spin.setValue(settings['ramp'])
+        if 'priority' in settings:
+            self.priority_spin.setValue(settings['priority'])
+    
+    def save_to_library(self):
+        """Save the current combination, timing table and settings under a name"""
+        if self.library is None:
+            self.status_label.setText("❌ The sequence library is not available.")
+            return
+        keys = self.get_current_keys()
+        if not keys:
+            self.status_label.setText("Please enter a key combination first.")
+            return
+        current = self.library_list.currentItem()
+        default_name = current.data(Qt.ItemDataRole.UserRole + 1) if current else ""
+        name, ok = QInputDialog.getText(self, "Save Sequence", "Name:", text=default_name)
+        name = name.strip()
+        if not ok or not name:
+            return
+        trigger = self.trigger_input.text().strip()
+        if trigger:
+            try:
+                parse_trigger(trigger)
+            except ValueError as e:
+                self.status_label.setText(f"❌ Invalid trigger: {e}")
+                return
+        sequence = SavedSequence(name=name,
+                                 combination=self.combo_input.text(),
+                                 intervals=tuple(self.get_timing_intervals()),
+                                 tags=parse_tags(self.library_tags_input.text()),
+                                 settings=self.sequence_settings(),
+                                 trigger=trigger)
+        try:
+            self.library.save(sequence, len(keys))
+        except sqlite3.Error as e:
+            self.status_label.setText(f"❌ Could not save: {e}")
+            return
+        self.refresh_library_list()
+        self.refresh_triggers()
+        self.status_label.setText(f"💾 Saved '{name}' to the library")
+    
+    def run_checked_sequences(self):
+        """Play every checked library sequence together, each at its own period"""
+        if self.is_running or self.is_testing or self.library is None or self.keyboard_controller.is_probing:
+            return
+        tracks = []
+        for sequence_id in sorted(self.checked_sequence_ids):
+            try:
+                sequence = self.library.load(sequence_id)
+                plan = compile_plan(sequence.combination, sequence.intervals,
+                                    self.keyboard_controller.resolve_key, hold_modifiers=False)
+            except KeyError:
+                continue
+            except ValueError as e:
+                self.status_label.setText(f"❌ {e}")
+                return
+            if plan is not None:
+                tracks.append(Track(name=sequence.name,
+                                    plan=plan,
+                                    repeats=sequence.settings.get('repeats', 0),
+                                    priority=sequence.settings.get('priority', 0)))
+        if not tracks:
+            self.status_label.setText("Check the library sequences to run together first.")
+            return
+        self.pending_tracks = tracks
+        self.begin_countdown()
+    
+    def start_multi_run(self):
+        """Start the combined run prepared by run_checked_sequences"""
+        tracks, self.pending_tracks = self.pending_tracks, None
+        self.is_running = True
+        self.press_count = 0
+        self.target_repeats = 0
+        self.motion_timeline = None
+        self.multi_tracks = tracks
+        self.start_btn.setEnabled(False)
+        self.stop_btn.setEnabled(True)
+        self.pause_btn.setEnabled(True)
+        self.keyboard_controller.start_multi_playback(tracks)
+        self.progress_timer.start(PROGRESS_REFRESH_MS)
+        self.telemetry_timer.start(500)
+        self.status_label.setText(f"Started {len(tracks)} sequences: {', '.join(track.name for track in tracks)}")
+    
+    def delete_from_library(self):
+        """Remove the selected sequence from the library"""
+        item = self.library_list.currentItem()
+        if item is None or self.library is None:
+            return
+        name = item.data(Qt.ItemDataRole.UserRole + 1)
+        self.library.delete(item.data(Qt.ItemDataRole.UserRole))
+        self.checked_sequence_ids.discard(item.data(Qt.ItemDataRole.UserRole))
+        self.refresh_library_list()
+        self.refresh_triggers()
+        self.status_label.setText(f"🗑️ Deleted '{name}' from the library")
+    
+    def update_move_time_preview(self):
+        """Show how long the repeat run takes with the selected motion profile"""
+        repeats = self.repeat_count_spin.value()
+        cycle_ns = combination_cycle_ns(self.combo_input.text(), self.get_timing_intervals())
+        if cycle_ns <= 0:
+            self.move_time_label.setText("")
+            return
+        kind = self.profile_combo.currentData()
+        constant_s = repeats * cycle_ns / 1e9
+        if self.burst_check.isChecked():
+            rate_hz = self.burst_rate_spin.value()
+            if not rate_hz:
+                self.move_time_label.setText(f"Move time: as fast as the backend allows (timed: {self.format_move_time(constant_s)})")
+                return
+            burst_s = max(repeats * combination_steps(self.combo_input.text()) - self.burst_size_spin.value(), 0) / rate_hz
+            self.move_time_label.setText(f"Move time: {self.format_move_time(burst_s)} (timed: {self.format_move_time(constant_s)})")
+            return
+        if kind == CONSTANT_PROFILE:
+            self.move_time_label.setText(f"Move time: {self.format_move_time(constant_s)}")
+            return
+        from autokey.motion import move_time_s
+        profiled_s = move_time_s(kind, repeats, cycle_ns, self.max_rate_spin.value(), self.ramp_spin.value())
+        self.move_time_label.setText(f"Move time: {self.format_move_time(profiled_s)} "
+                                     f"(constant: {self.format_move_time(constant_s)})")
+    
+    def paintEvent(self, event):
+        """Report startup timing once the window has been painted"""
+        super().paintEvent(event)
+        if not self.first_paint_done:
+            self.first_paint_done = True
+            self.profiler.mark("first_paint")
+            if self.profiler.enabled:
+                print(self.profiler.report(), file=sys.stderr)
+                self.status_label.setText(f"Ready to start... (started in {self.profiler.total_ms:.0f} ms)")
+    
+    def closeEvent(self, event):
+        """Make sure no keys are sent after the window is closed"""
+        self.keyboard_controller.shutdown()
+        if self.library is not None:
+            self.library.close()
+        super().closeEvent(event)
+    
+    def format_move_time(self, seconds):
+        """Like format_time_remaining, with tenths for short moves"""
+        if seconds < 60:
+            return f"{seconds:.1f}s"
+        return self.format_time_remaining(seconds)
     
     def format_time_remaining(self, seconds):
         """Format time remaining as either seconds or min:sec"""
@@ -937,14 +2207,19 @@ class AutoKeyApp(QMainWindow):
 
 
 def main():
-    app = QApplication(sys.argv)
+    configure_logging()
+    profiler = StartupProfiler(enabled=profiling_requested(sys.argv), origin_ns=_STARTUP_NS)
+    profiler.mark("import")
+    app = QApplication([arg for arg in sys.argv if arg != PROFILE_FLAG])
     app.setApplicationName("AutoKey")
     
     # Set application style
     app.setStyle('Fusion')
     
-    window = AutoKeyApp()
+    profiler.mark("qapplication")
+    window = AutoKeyApp(profiler)
     window.show()
+    profiler.mark("show")
     
     sys.exit(app.exec())
 
@@ -0,0 +1,52 @@
+"""Opening .akm macro files, including damaged ones"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autokey.macro import HEADER, MAGIC, RECORD, VERSION, Macro, save_macro  # noqa: E402
+from autokey.recorder import EventLog  # noqa: E402
+from autokey.telemetry import PRESS, RELEASE  # noqa: E402
+
+
+def saved_macro(path):
+    log = EventLog()
+    log.clear(0)
+    log.append('a', PRESS, 1_000)
+    log.append('a', RELEASE, 2_000)
+    log.append('enter', PRESS, 5_000)
+    log.append('enter', RELEASE, 6_000)
+    log.finish(9_000)
+    save_macro(path, log)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'ok.akm')
+    saved_macro(path)
+    macro = Macro(path)
+    try:
+        assert macro.key_names == ['a', 'enter']
+        assert list(macro.events()) == [('a', PRESS, 0), ('a', RELEASE, 1_000),
+                                        ('enter', PRESS, 3_000), ('enter', RELEASE, 1_000)]
+    finally:
+        macro.close()
+
+
+@pytest.mark.parametrize('keep', [HEADER.size - 1, HEADER.size, HEADER.size + 1, HEADER.size + 3, -RECORD.size])
+def test_truncated_file(tmp_path, keep):
+    data = saved_macro(str(tmp_path / 'full.akm'))
+    path = tmp_path / 'cut.akm'
+    path.write_bytes(data[:keep])
+    with pytest.raises(ValueError):
+        Macro(str(path))
+
+
+def test_header_without_key_table(tmp_path):
+    path = tmp_path / 'no_keys.akm'
+    path.write_bytes(HEADER.pack(MAGIC, VERSION, 1, 0, 0, 0))
+    with pytest.raises(ValueError):
+        Macro(str(path))